@@ -1,3 +1,20 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ProductForecast, TrainingJob
+
+
+@admin.register(ProductForecast)
+class ProductForecastAdmin(admin.ModelAdmin):
+    list_display = ('product', 'horizon', 'predicted_demand', 'model_version', 'computed_at')
+    list_filter = ('horizon', 'computed_at')
+    search_fields = ('product__name', 'product__product_id')
+    list_select_related = ('product',)
+    readonly_fields = ('daily_demand', 'model_version', 'computed_at')
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'backend', 'status', 'progress', 'cores', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'source')
+    readonly_fields = ('status', 'progress', 'message', 'metrics', 'model_version', 'started_at', 'heartbeat_at',
+                       'finished_at')
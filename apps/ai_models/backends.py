@@ -0,0 +1,190 @@
+import abc
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from joblib import effective_n_jobs
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from threadpoolctl import threadpool_limits
+
+
+class ForecastBackend(abc.ABC):
+    """
+    Common interface of the demand model backends.
+
+    fit(X, y) / predict(X) take the feature DataFrame built by DemandForecastAI (rows in
+    date order); the fitted backend is pickled as the 'model' of the forecast artifact.
+    """
+    name = None
+
+    @abc.abstractmethod
+    def fit(self, X, y):
+        """Train on X, y and return self"""
+
+    @abc.abstractmethod
+    def predict(self, X):
+        """One prediction per row of X"""
+
+
+class RandomForestBackend(ForecastBackend):
+    name = 'random_forest'
+
+    def __init__(self, n_estimators=100, n_jobs=-1):
+        self.model = RandomForestRegressor(n_estimators=n_estimators, random_state=888, n_jobs=n_jobs)
+
+    def fit(self, X, y):
+        self.model.fit(X, y)
+        return self
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+
+class HistGradientBoostingBackend(ForecastBackend):
+    """Histogram gradient boosting: a few hundred shallow trees, much smaller than the forest"""
+    name = 'hist_gradient_boosting'
+
+    def __init__(self, max_iter=200, n_jobs=None):
+        self.model = HistGradientBoostingRegressor(max_iter=max_iter, random_state=888)
+        self.n_jobs = n_jobs
+
+    def _threads(self):
+        # The estimator has no n_jobs; it runs on OpenMP threads, one per core by default
+        n_jobs = getattr(self, 'n_jobs', None)
+        if n_jobs is None:
+            return nullcontext()
+        return threadpool_limits(limits=effective_n_jobs(n_jobs), user_api='openmp')
+
+    def fit(self, X, y):
+        with self._threads():
+            self.model.fit(X, y)
+        return self
+
+    def predict(self, X):
+        with self._threads():
+            return self.model.predict(X)
+
+
+class ExponentialSmoothingBackend(ForecastBackend):
+    """
+    Per-product exponentially smoothed level times a day-of-week profile.
+    The whole model is two float32 arrays: level[product] and season[product, weekday].
+    """
+    name = 'exp_smoothing'
+
+    def __init__(self, alpha=0.1, shrinkage=10, n_jobs=None):
+        self.alpha = alpha
+        self.shrinkage = shrinkage
+        self.level = None
+        self.season = None
+        self.global_level = 0.0
+
+    def fit(self, X, y):
+        products = X['product_code_int'].to_numpy(dtype=np.int64)
+        weekdays = X['day_of_week'].to_numpy(dtype=np.int64)
+        y = pd.Series(np.asarray(y, dtype=np.float64))
+        n_products = int(products.max()) + 1
+
+        # Grouped EWM runs in pandas' compiled code; the last value per product is its level
+        smoothed = y.groupby(products).ewm(alpha=self.alpha).mean()
+        last = smoothed.groupby(level=0).last()
+        self.level = np.zeros(n_products, dtype=np.float32)
+        self.level[last.index.to_numpy()] = last.to_numpy()
+        self.global_level = float(y.mean())
+
+        # Weekday ratios, shrunk toward 1 for products with few observations on that weekday
+        cell = products * 7 + weekdays
+        sums = np.bincount(cell, weights=y, minlength=n_products * 7).reshape(n_products, 7)
+        counts = np.bincount(cell, minlength=n_products * 7).reshape(n_products, 7)
+        product_mean = sums.sum(axis=1) / np.maximum(counts.sum(axis=1), 1)
+        ratio = np.divide(sums / np.maximum(counts, 1), product_mean[:, None],
+                          out=np.ones((n_products, 7)), where=product_mean[:, None] > 0)
+        weight = counts / (counts + self.shrinkage)
+        self.season = (weight * ratio + (1 - weight)).astype(np.float32)
+        return self
+
+    def predict(self, X):
+        products = X['product_code_int'].to_numpy(dtype=np.int64)
+        weekdays = X['day_of_week'].to_numpy(dtype=np.int64)
+        known = (products >= 0) & (products < len(self.level))
+        predictions = np.full(len(products), self.global_level)
+        predictions[known] = self.level[products[known]] * self.season[products[known], weekdays[known]]
+        return predictions
+
+
+class QuantizedForestBackend(ForecastBackend):
+    """
+    A small random forest flattened into NumPy arrays after training: int16 features,
+    float32 thresholds, int32 children and float32 leaf values. No sklearn objects are
+    pickled, so the artifact is a few flat arrays that load almost instantly.
+    """
+    name = 'quantized_forest'
+
+    def __init__(self, n_estimators=20, max_depth=12, n_jobs=-1):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y):
+        forest = RandomForestRegressor(n_estimators=self.n_estimators, max_depth=self.max_depth,
+                                       min_samples_leaf=2, random_state=888, n_jobs=self.n_jobs)
+        forest.fit(X, y)
+
+        features, thresholds, left, right, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            roots.append(offset)
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            # Leaves point to themselves so every row can take the same number of steps
+            own = np.arange(tree.node_count) + offset
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            values.append(tree.value[:, 0, 0])
+            offset += tree.node_count
+
+        self.feature = np.concatenate(features).astype(np.int16)
+        self.threshold = np.concatenate(thresholds).astype(np.float32)
+        self.left = np.concatenate(left).astype(np.int32)
+        self.right = np.concatenate(right).astype(np.int32)
+        # float32, not float16: demand above 65504 would overflow to inf
+        self.value = np.concatenate(values).astype(np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.depth = max(estimator.tree_.max_depth for estimator in forest.estimators_)
+        return self
+
+    def predict(self, X):
+        # sklearn compares float32 features against float32 thresholds; do the same
+        data = np.asarray(X, dtype=np.float32)
+        n_rows = len(data)
+        rows = np.tile(np.arange(n_rows), len(self.roots))
+        nodes = np.repeat(self.roots, n_rows)
+        for _ in range(self.depth):
+            go_left = data[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        leaf_values = self.value[nodes].astype(np.float64).reshape(len(self.roots), n_rows)
+        return leaf_values.mean(axis=0)
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (RandomForestBackend, HistGradientBoostingBackend,
+                    ExponentialSmoothingBackend, QuantizedForestBackend)
+}
+
+
+def default_backend_name():
+    return getattr(settings, 'AI_FORECAST_BACKEND', RandomForestBackend.name)
+
+
+def get_backend(name=None, **options):
+    """Instantiate a backend by name (default: settings.AI_FORECAST_BACKEND)"""
+    if name is None:
+        name = default_backend_name()
+    try:
+        return BACKENDS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown forecast backend '{name}'. Choices: {', '.join(BACKENDS)}")
@@ -0,0 +1,146 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from .backends import default_backend_name, get_backend
+from .lags import LAG_FEATURES, frozen_lag_features, latest_state
+
+# Worker processes import this module without Django set up (spawn/forkserver start methods),
+# so it must not import Django models, directly or through .features.
+# Filled once per worker process by _init_worker so the frame is not re-sent for every fold
+_data = {}
+
+
+def rolling_origins(dates, folds, horizon):
+    """Start days of the last `folds` consecutive test windows of `horizon` days, oldest first"""
+    last_day = pd.Timestamp(dates.max()).normalize()
+    return [last_day - pd.Timedelta(days=horizon * k - 1) for k in range(folds, 0, -1)]
+
+
+def _init_worker(dates, X, y):
+    _data['dates'] = dates
+    _data['X'] = X
+    _data['y'] = y
+
+
+def _frozen_at_origin(dates, X, y, train, test, origin):
+    """
+    Test rows with their lag features recomputed from the training window only.
+
+    The stored lag/rolling features of a test row were computed from the days just before
+    it, i.e. from actual demand inside the test window. At forecast time that demand is not
+    known yet, so they are rebuilt the way predict_matrix builds them: from each product's
+    state on the day before `origin`.
+    """
+    codes = X.loc[train, 'product_code_int']
+    history = pd.DataFrame({
+        'product_code': codes.to_numpy(),
+        'date': dates[train].to_numpy(),
+        'demand': y[train].to_numpy(),
+    })
+    state = latest_state(history, {code: code for code in codes.unique()})
+
+    X_test = X[test].copy()
+    lags = frozen_lag_features([state.get(code, {}) for code in X_test['product_code_int']],
+                               origin - pd.Timedelta(days=1), dates[test])
+    for name in LAG_FEATURES:
+        X_test[name] = lags[name].to_numpy()
+    return X_test
+
+
+def evaluate_fold(origin, horizon, backend, options):
+    """
+    Train on everything before `origin`, forecast the next `horizon` days.
+    Also scores a naive baseline (each product's mean demand in the training window).
+    """
+    dates, X, y = _data['dates'], _data['X'], _data['y']
+    train = (dates < origin).to_numpy()
+    test = ((dates >= origin) & (dates < origin + pd.Timedelta(days=horizon))).to_numpy()
+    result = {'origin': origin.date(), 'train_rows': int(train.sum()), 'test_rows': int(test.sum())}
+    if not train.any() or not test.any():
+        return result
+
+    # One core per fold: the parallelism comes from running folds side by side
+    model = get_backend(backend, n_jobs=1, **options)
+    started = time.perf_counter()
+    model.fit(X[train], y[train])
+    result['fit_seconds'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    X_test = _frozen_at_origin(dates, X, y, train, test, origin) if LAG_FEATURES[0] in X else X[test]
+    y_pred = model.predict(X_test)
+    result['predict_ms_per_1k'] = (time.perf_counter() - started) * 1000 / test.sum() * 1000
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    result['size_kb'] = buffer.tell() / 1024
+
+    product_means = y[train].groupby(X.loc[train, 'product_code_int']).mean()
+    baseline = X.loc[test, 'product_code_int'].map(product_means).fillna(y[train].mean())
+
+    result['mae'] = mean_absolute_error(y[test], y_pred)
+    result['baseline_mae'] = mean_absolute_error(y[test], baseline)
+    return result
+
+
+def run_backtest(dates, X, y, folds=4, horizon=30, workers=None, backend=None, options=None):
+    """
+    Rolling-origin evaluation: one fold per origin, folds fitted in parallel processes.
+    Returns one result dict per fold, oldest origin first.
+    """
+    dates = pd.Series(pd.to_datetime(dates).to_numpy(), index=X.index)
+    origins = rolling_origins(dates, folds, horizon)
+    workers = workers or min(len(origins), os.cpu_count() or 1)
+
+    # Resolved here: the workers do not load the Django settings
+    evaluate = partial(evaluate_fold, horizon=horizon, backend=backend or default_backend_name(),
+                       options=options or {})
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(dates, X, y)) as pool:
+        return list(pool.map(evaluate, origins))
+
+
+def summarize(results):
+    scored = [r for r in results if 'mae' in r]
+    if not scored:
+        return {}
+    return {key: float(np.mean([r[key] for r in scored]))
+            for key in ('mae', 'baseline_mae', 'fit_seconds', 'predict_ms_per_1k', 'size_kb')}
+
+
+def rss_mb():
+    """Resident memory of this process in MB (NaN where neither /proc nor resource exists, e.g. Windows)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure_artifact(path, X, rounds):
+    """Runs in a fresh worker process: load time, RSS added by the load, batch predict throughput"""
+    before = rss_mb()
+    started = time.perf_counter()
+    model = joblib.load(path)
+    load_seconds = time.perf_counter() - started
+    rss_delta = rss_mb() - before
+
+    model.predict(X[:100])
+    started = time.perf_counter()
+    for _ in range(rounds):
+        model.predict(X)
+    rows_per_second = len(X) * rounds / (time.perf_counter() - started)
+    return load_seconds, rss_delta, rows_per_second
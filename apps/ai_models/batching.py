@@ -0,0 +1,87 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into small batches for one model call.
+
+    submit() blocks the calling thread until its result is ready, at most `timeout` seconds.
+    A single daemon thread waits for the first item, keeps collecting until `max_batch_size`
+    items or `max_delay` seconds have passed, then calls run_batch(items) and hands each
+    caller its result. A worker that died is restarted by the next submit().
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_delay=0.005, timeout=30):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_worker(self):
+        # Started lazily so forked web workers each get their own thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+                    self._thread.start()
+
+    def submit(self, item, timeout=None):
+        """run_batch's result for `item`; TimeoutError after `timeout` (default self.timeout) seconds"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except TimeoutError:
+            # Still queued: the worker skips cancelled items instead of running them for nobody
+            future.cancel()
+            if not self._thread.is_alive():
+                raise RuntimeError('Micro-batch worker thread has stopped') from None
+            raise
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(batch):
+                    raise RuntimeError(f'run_batch returned {len(results)} results for {len(batch)} items')
+            except BaseException as e:
+                # Callers get the error instead of waiting on a batch that will never finish
+                for _, future in batch:
+                    future.set_exception(e)
+                if not isinstance(e, Exception):
+                    raise
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            self.batches += 1
+            self.items += len(batch)
+
+    @property
+    def average_batch_size(self):
+        return self.items / self.batches if self.batches else 0
@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+RAW_COLUMNS = ['Product_Code', 'Warehouse', 'Product_Category', 'Date', 'Order_Demand']
+CACHE_VERSION = 1
+CHUNK_SIZE = 250_000
+
+
+def _clean_chunk(chunk):
+    """Same cleaning as the original train(): '(123)' -> 123, coerce dates, drop bad rows"""
+    demand = chunk['Order_Demand'].astype(str).str.replace(r'[()]', '', regex=True)
+    chunk = chunk.assign(
+        Order_Demand=pd.to_numeric(demand, errors='coerce'),
+        Date=pd.to_datetime(chunk['Date'], errors='coerce'),
+    ).dropna(subset=['Product_Code', 'Warehouse', 'Date', 'Order_Demand'])
+    chunk['Product_Category'] = chunk['Product_Category'].fillna('')
+    return chunk
+
+
+class DemandDataset:
+    """
+    Cleaned, typed columnar cache of the Kaggle "Historical Product Demand" CSV.
+
+    The raw file is read once in chunks (bounded memory) and written as one directory
+    per warehouse of Parquet parts. The cache is reused until the source file's size
+    or mtime changes, so retraining or switching warehouse only reads the small,
+    already-typed partition it needs.
+    """
+
+    def __init__(self, source_path, cache_dir=None, chunk_size=CHUNK_SIZE):
+        self.source_path = source_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(source_path), 'cache', 'demand')
+        self.manifest_path = os.path.join(self.cache_dir, 'manifest.json')
+        self.chunk_size = chunk_size
+
+    def _fingerprint(self):
+        stat = os.stat(self.source_path)
+        return {
+            'source': os.path.basename(self.source_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'version': CACHE_VERSION,
+            'format': CACHE_FORMAT,
+        }
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self):
+        manifest = self._read_manifest()
+        return manifest is not None and manifest.get('fingerprint') == self._fingerprint()
+
+    def build(self):
+        if not os.path.exists(self.source_path):
+            raise FileNotFoundError(f"Dataset not found at: {self.source_path}")
+
+        fingerprint = self._fingerprint()
+        parent = os.path.dirname(self.cache_dir)
+        os.makedirs(parent, exist_ok=True)
+        # Unique per build, so a concurrent build (worker + prepare_dataset) never deletes ours
+        tmp_dir = tempfile.mkdtemp(prefix=f'{os.path.basename(self.cache_dir)}.', suffix='.tmp', dir=parent)
+        try:
+            rows = {}
+            reader = pd.read_csv(self.source_path, usecols=RAW_COLUMNS, dtype=str, chunksize=self.chunk_size)
+            for part, chunk in enumerate(reader):
+                chunk = _clean_chunk(chunk)
+                for warehouse, frame in chunk.groupby('Warehouse', sort=False):
+                    warehouse_dir = os.path.join(tmp_dir, f'warehouse={warehouse}')
+                    os.makedirs(warehouse_dir, exist_ok=True)
+                    frame = frame.drop(columns='Warehouse').reset_index(drop=True)
+                    path = os.path.join(warehouse_dir, f'part-{part:05d}.{CACHE_FORMAT}')
+                    if CACHE_FORMAT == 'parquet':
+                        frame.to_parquet(path, index=False)
+                    else:
+                        frame.to_pickle(path)
+                    rows[warehouse] = rows.get(warehouse, 0) + len(frame)
+
+            with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+                json.dump({'fingerprint': fingerprint, 'warehouses': rows}, f)
+
+            # Swap the whole directory so readers never see a half-built cache
+            old_dir = f'{tmp_dir}.old'
+            try:
+                os.replace(self.cache_dir, old_dir)
+            except FileNotFoundError:
+                pass
+            try:
+                os.replace(tmp_dir, self.cache_dir)
+            except OSError:
+                # Another build published in between; it read the same source file
+                if not self.is_fresh():
+                    raise
+            shutil.rmtree(old_dir, ignore_errors=True)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return rows
+
+    def ensure(self):
+        if not self.is_fresh():
+            self.build()
+        return self._read_manifest()
+
+    def warehouses(self):
+        return sorted(self.ensure()['warehouses'])
+
+    def load(self, warehouse):
+        """Return the cleaned rows of one warehouse (Date, Order_Demand, Product_Code, Product_Category)"""
+        known = self.ensure()['warehouses']
+        warehouse_dir = os.path.join(self.cache_dir, f'warehouse={warehouse}')
+        if warehouse not in known or not os.path.isdir(warehouse_dir):
+            raise ValueError(f"Warehouse '{warehouse}' not found in the dataset. Choices: {', '.join(sorted(known))}")
+
+        parts = sorted(os.listdir(warehouse_dir))
+        read = pd.read_parquet if CACHE_FORMAT == 'parquet' else pd.read_pickle
+        df = pd.concat([read(os.path.join(warehouse_dir, part)) for part in parts], ignore_index=True)
+        df['Product_Code'] = df['Product_Code'].astype('category')
+        df['Product_Category'] = df['Product_Category'].astype('category')
+        df['Warehouse'] = warehouse
+        return df
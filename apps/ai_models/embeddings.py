@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+from apps.catalog.models import Product
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+EMPTY_INDEX = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=str), np.zeros((0, 0), dtype=np.float32))
+
+
+def index_path():
+    return os.path.join(settings.MEDIA_ROOT, 'models', 'product_embeddings.npz')
+
+
+@contextmanager
+def _file_lock(lock_file):
+    """Exclusive lock on an open file: flock on Unix, msvcrt.locking on Windows"""
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return
+
+    lock_file.seek(0)
+    while True:
+        try:
+            # LK_LOCK gives up after ~10 seconds; keep waiting like flock does
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            break
+        except OSError:
+            continue
+    try:
+        yield
+    finally:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ProductEmbeddingIndex:
+    """
+    MobileNetV2 image embeddings of every active product with an image.
+
+    Stored as one uncompressed .npz: a float16 (n_products, 1280) matrix of L2-normalised
+    vectors, the product pks and the image file each row was computed from. Rows are only
+    recomputed when a product's image changes; images that could not be read are recorded
+    as well and only retried once the image changes. In memory the matrix is kept as float32
+    so a cosine search is a single BLAS matrix-vector product plus argpartition.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or index_path()
+        # (product_ids, sources, vectors) is only ever replaced as a whole, so search() never
+        # pairs the ids of one version of the file with the vectors of another
+        self._index = EMPTY_INDEX
+        # {product pk: image name} of images that failed to embed
+        self.failed = {}
+        self._loaded_signature = None
+        self._lock = threading.Lock()
+
+    @property
+    def product_ids(self):
+        return self._index[0]
+
+    @property
+    def sources(self):
+        return self._index[1]
+
+    @property
+    def vectors(self):
+        return self._index[2]
+
+    @contextmanager
+    def _write_lock(self):
+        """
+        Serialize sync() across threads and processes: every writer re-reads the file under
+        an exclusive file lock, so rows written by another worker are never lost.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(f'{self.path}.lock', 'a+') as lock_file, _file_lock(lock_file):
+            yield
+
+    def _file_signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """(Re)read the index file if another process has rewritten it"""
+        if not os.path.exists(self.path):
+            return False
+        signature = self._file_signature()
+        if signature != self._loaded_signature:
+            with np.load(self.path) as data:
+                index = data['product_ids'], data['sources'], data['vectors'].astype(np.float32)
+                # Files written before failures were recorded have no failed_* arrays
+                failed = (dict(zip(data['failed_ids'].tolist(), data['failed_sources'].tolist()))
+                          if 'failed_ids' in data else {})
+            self._index = index
+            self.failed = failed
+            self._loaded_signature = signature
+        return True
+
+    def _save(self):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp.npz'
+        product_ids, sources, vectors = self._index
+        try:
+            np.savez(tmp_path, product_ids=product_ids, sources=sources, vectors=vectors.astype(np.float16),
+                     failed_ids=np.asarray(list(self.failed), dtype=np.int64),
+                     failed_sources=np.asarray(list(self.failed.values()), dtype=str))
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._loaded_signature = self._file_signature()
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @staticmethod
+    def _embed(products, batch_size):
+        """Returns (ids, sources, vectors, failed) where failed maps pk -> image name"""
+        empty = EMPTY_INDEX + ({},)
+        if not products:
+            return empty
+
+        from .loader import get_classifier
+        classifier = get_classifier()
+
+        ids, sources, vectors, failed = [], [], [], {}
+        for start in range(0, len(products), batch_size):
+            tensors, batch = [], []
+            for product in products[start:start + batch_size]:
+                try:
+                    with product.image.open('rb') as f:
+                        tensors.append(classifier.prepare(f))
+                except (OSError, ValueError) as e:
+                    logger.warning('Skipping image of product %s: %s', product.product_id, e)
+                    failed[product.pk] = product.image.name
+                    continue
+                batch.append(product)
+            if tensors:
+                vectors.append(classifier.embed_batch(tensors))
+                ids.extend(product.pk for product in batch)
+                sources.extend(product.image.name for product in batch)
+        if not vectors:
+            return EMPTY_INDEX + (failed,)
+        return np.asarray(ids, dtype=np.int64), np.asarray(sources, dtype=str), np.concatenate(vectors), failed
+
+    def sync(self, product_ids=None, full=False, batch_size=32):
+        """
+        Bring the index up to date with the products table (or only `product_ids`).
+        Returns (embedded, removed): rows recomputed and rows dropped.
+        """
+        with self._write_lock():
+            if full:
+                self._index = EMPTY_INDEX
+                self.failed = {}
+            else:
+                self.load()
+            old_ids, old_sources, old_vectors = self._index
+
+            products = Product.objects.filter(is_active=True).exclude(image='').exclude(image__isnull=True)
+            if product_ids is not None:
+                product_ids = {int(pk) for pk in product_ids}
+                products = products.filter(pk__in=product_ids)
+            wanted = {product.pk: product for product in products}
+            stored = dict(zip(old_ids.tolist(), old_sources.tolist()))
+
+            scope = product_ids if product_ids is not None else set(stored) | set(wanted) | set(self.failed)
+            to_embed = [wanted[pk] for pk in scope
+                        if pk in wanted and wanted[pk].image.name not in (stored.get(pk), self.failed.get(pk))]
+            to_remove = [pk for pk in scope if pk in stored and pk not in wanted]
+            forgotten = [pk for pk in scope if pk in self.failed and pk not in wanted]
+            if not to_embed and not to_remove and not forgotten:
+                return 0, 0
+
+            ids, sources, vectors, failed = self._embed(to_embed, batch_size)
+            keep = ~np.isin(old_ids, to_remove + [product.pk for product in to_embed])
+            if not len(old_vectors):
+                new_vectors = vectors
+            elif len(vectors):
+                new_vectors = np.concatenate([old_vectors[keep], vectors])
+            else:
+                new_vectors = old_vectors[keep]
+            self._index = (np.concatenate([old_ids[keep], ids]), np.concatenate([old_sources[keep], sources]),
+                           new_vectors)
+            for pk in forgotten + [product.pk for product in to_embed]:
+                self.failed.pop(pk, None)
+            self.failed.update(failed)
+            self._save()
+            return len(ids), len(to_remove)
+
+    def search(self, vector, k=5):
+        """Cosine top-k against the index: [(product pk, score)] best first"""
+        self.load()
+        product_ids, _, vectors = self._index
+        if not len(product_ids) or k < 1:
+            return []
+        scores = vectors @ np.asarray(vector, dtype=np.float32)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(product_ids[i]), float(scores[i])) for i in top]
+
+
+product_index = ProductEmbeddingIndex()
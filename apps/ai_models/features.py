@@ -0,0 +1,134 @@
+import json
+import os
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.sales.models import OrderItem
+from .lags import LAG_FEATURES, frozen_lag_features, latest_state  # noqa: F401
+
+HISTORY_COLUMNS = ['product_code', 'category', 'date', 'demand']
+CALENDAR_FEATURES = ['day_of_year', 'day_of_week', 'month', 'product_code_int']
+DB_FEATURES = CALENDAR_FEATURES + LAG_FEATURES
+
+
+def stream_daily_demand(since=None, until=None, chunk_size=5000):
+    """
+    Yield DataFrames of delivered quantity per (product, day), `chunk_size` rows at a time.
+
+    The GROUP BY runs in the database and rows are pulled with .iterator(), which uses a
+    server-side cursor on PostgreSQL, so memory stays bounded however long the history is.
+    """
+    tz = timezone.get_current_timezone()
+    items = OrderItem.objects.filter(order__status='delivered')
+    if since:
+        items = items.filter(order__created_at__gte=datetime.combine(since, time.min, tzinfo=tz))
+    if until:
+        items = items.filter(order__created_at__lt=datetime.combine(until + timedelta(days=1), time.min, tzinfo=tz))
+
+    rows = (items.annotate(date=TruncDate('order__created_at'))
+            .values_list('product__product_id', 'product__category__category_id', 'date')
+            .annotate(demand=Sum('quantity'))
+            .order_by('date', 'product__product_id')
+            .iterator(chunk_size=chunk_size))
+
+    buffer = []
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield _to_frame(buffer)
+            buffer = []
+    if buffer:
+        yield _to_frame(buffer)
+
+
+def _to_frame(rows):
+    df = pd.DataFrame(rows, columns=HISTORY_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    df['demand'] = df['demand'].astype('float64')
+    return df
+
+
+class SalesHistory:
+    """
+    Daily delivered demand per product, extracted from the database and kept on disk.
+
+    update() only pulls days after the stored watermark (plus a short look-back window,
+    because orders are counted on their creation date but only become 'delivered' later).
+    """
+
+    def __init__(self, path=None, lookback_days=14):
+        self.path = path or os.path.join(settings.MEDIA_ROOT, 'data', 'cache', 'sales_history.pkl')
+        self.meta_path = f'{self.path}.json'
+        self.lookback_days = lookback_days
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return _to_frame([])
+        return pd.read_pickle(self.path)
+
+    def watermark(self):
+        try:
+            with open(self.meta_path) as f:
+                return datetime.strptime(json.load(f)['last_day'], '%Y-%m-%d').date()
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def update(self, full=False, chunk_size=5000):
+        """Append new days to the stored history. Returns (history, number of rows fetched)."""
+        last_complete_day = timezone.localdate() - timedelta(days=1)
+        watermark = None if full else self.watermark()
+
+        history = self.load() if watermark else _to_frame([])
+        since = watermark - timedelta(days=self.lookback_days - 1) if watermark else None
+
+        chunks = list(stream_daily_demand(since=since, until=last_complete_day, chunk_size=chunk_size))
+        fetched = sum(len(chunk) for chunk in chunks)
+
+        if since is not None and len(history):
+            history = history[history['date'] < pd.Timestamp(since)]
+        if chunks:
+            history = pd.concat([frame for frame in (history, *chunks) if len(frame)], ignore_index=True)
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        history.to_pickle(tmp_path)
+        os.replace(tmp_path, self.path)
+        with open(self.meta_path, 'w') as f:
+            json.dump({'last_day': last_complete_day.isoformat(), 'rows': len(history)}, f)
+
+        return history, fetched
+
+
+def build_features(history, code_index):
+    """
+    Turn long (product_code, date, demand) rows into model features.
+
+    Demand is pivoted into a dense date x product matrix (missing days = 0) so the lag and
+    rolling-window features are computed column-wise by pandas in one pass, with no
+    per-product Python loop. Every lag only uses days strictly before the target day.
+    """
+    wide = history.pivot_table(index='date', columns='product_code', values='demand', aggfunc='sum')
+    wide = wide.asfreq('D').fillna(0.0)
+
+    previous = wide.shift(1)
+    frames = {
+        'demand': wide,
+        'lag_7': wide.shift(7),
+        'rolling_mean_7': previous.rolling(7, min_periods=1).mean(),
+        'rolling_mean_28': previous.rolling(28, min_periods=1).mean(),
+    }
+    features = pd.concat({name: frame.stack(future_stack=True) for name, frame in frames.items()}, axis=1)
+    features = features.reset_index().rename(columns={'level_0': 'date'})
+    features = features[features['product_code'].isin(code_index.keys())].dropna(subset=LAG_FEATURES)
+
+    dates = features['date'].dt
+    features['day_of_year'] = dates.dayofyear
+    features['day_of_week'] = dates.dayofweek
+    features['month'] = dates.month
+    features['product_code_int'] = features['product_code'].map(code_index)
+    return features.reset_index(drop=True)
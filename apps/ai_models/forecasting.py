@@ -1,11 +1,26 @@
+import hashlib
+import logging
 import os
+import threading
+import zlib
+
 import joblib
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import r2_score, mean_absolute_error
 from django.conf import settings
 
+from .backends import get_backend
+from .datasets import DemandDataset
+from .features import (CALENDAR_FEATURES, DB_FEATURES, LAG_FEATURES, SalesHistory, build_features, frozen_lag_features,
+                       latest_state)
+
+logger = logging.getLogger(__name__)
+
+
+def _no_progress(percent, message):
+    pass
+
 
 class DemandForecastAI:
     def __init__(self):
@@ -16,31 +31,85 @@ class DemandForecastAI:
         os.makedirs(self.model_dir, exist_ok=True)
         self.model = None
         self.unique_product_codes = []
+        self.code_index = {}
+        self.fallback = None
+        self.backend = None
+        self.features = CALENDAR_FEATURES
+        self.product_state = {}
+        self.history_end = None
+        self.demand_scale = 100
+        self.source = None
+        self.model_version = None
+        self._loaded_signature = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        stat = os.stat(self.model_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _file_digest(self):
+        digest = hashlib.sha256()
+        with open(self.model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _read_artifact(self):
+        # mmap_mode lets the numpy arrays inside the pickle be shared page cache
+        # between worker processes instead of private copies in every worker
+        try:
+            return joblib.load(self.model_path, mmap_mode='r')
+        except (ValueError, OSError):
+            return joblib.load(self.model_path)
+
+    def _apply_artifact(self, data):
+        self.model = data['model']
+        self.unique_product_codes = data['codes']
+        # Artifacts trained before the explicit mapping used cat.codes, i.e. sorted code order
+        self.code_index = data.get('code_index') or {
+            str(code): i for i, code in enumerate(sorted(data['codes']))
+        }
+        self.fallback = data.get('fallback')
+        self.backend = data.get('backend', 'random_forest')
+        self.features = data.get('features', CALENDAR_FEATURES)
+        self.product_state = data.get('product_state', {})
+        self.history_end = data.get('history_end')
+        # Kaggle demand is in units of 100, in-app sales history is in pieces
+        self.demand_scale = data.get('demand_scale', 100)
+        self.source = data.get('source', 'csv')
 
     def load_model(self):
-        if os.path.exists(self.model_path):
-            try:
-                data = joblib.load(self.model_path)
-                self.model = data['model']
-                self.unique_product_codes = data['codes']
+        """
+        Keep the model resident between requests.
+        The pickle is only re-read when the file's mtime/size changes and its content hash differs.
+        """
+        if not os.path.exists(self.model_path):
+            return False
+        try:
+            signature = self._file_signature()
+            if self.model is not None and signature == self._loaded_signature:
                 return True
-            except:
-                return False
-        return False
 
-    def train(self):
+            with self._lock:
+                if self.model is not None and signature == self._loaded_signature:
+                    return True
+
+                digest = self._file_digest()
+                if self.model is None or digest != self.model_version:
+                    self._apply_artifact(self._read_artifact())
+                    self.model_version = digest
+                self._loaded_signature = signature
+            return True
+        except Exception:
+            return self.model is not None
+
+    def csv_training_frame(self, warehouse='Whse_C'):
+        """Rows of one warehouse with calendar features: (df_train, viable_products, code_index)"""
         if not os.path.exists(self.dataset_path):
             raise FileNotFoundError(f"Dataset not found at: {self.dataset_path}")
 
-        df = pd.read_csv(self.dataset_path, usecols=['Date', 'Order_Demand', 'Product_Code', 'Warehouse'])
-
-        df['Order_Demand'] = df['Order_Demand'].astype(str).str.replace('(', '', regex=False).str.replace(')', '',
-                                                                                                          regex=False)
-        df['Order_Demand'] = pd.to_numeric(df['Order_Demand'], errors='coerce')
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df = df.dropna()
-
-        df = df[df['Warehouse'] == 'Whse_C']
+        # Cleaned per-warehouse columnar cache, rebuilt only when the CSV changes
+        df = DemandDataset(self.dataset_path).load(warehouse)
 
         product_counts = df['Product_Code'].value_counts()
         viable_products = product_counts[product_counts >= 10].index.tolist()
@@ -53,17 +122,103 @@ class DemandForecastAI:
         df_train['month'] = df_train['Date'].dt.month
         df_train['quarter'] = df_train['Date'].dt.quarter
 
-        df_train['product_code_int'] = df_train['Product_Code'].astype('category').cat.codes
+        # Explicit, persisted code -> index mapping (stable across processes, unlike hash())
+        code_index = {str(code): i for i, code in enumerate(sorted(viable_products))}
+        df_train['product_code_int'] = df_train['Product_Code'].astype(str).map(code_index)
+        return df_train, viable_products, code_index
 
-        X = df_train[['day_of_year', 'day_of_week', 'month', 'product_code_int']]
-        y = df_train['Order_Demand']
+    def train(self, warehouse='Whse_C', backend=None, n_jobs=None, progress=None):
+        progress = progress or _no_progress
+        progress(5, 'Loading dataset')
+        df_train, viable_products, code_index = self.csv_training_frame(warehouse)
 
-        model = RandomForestRegressor(n_estimators=100, random_state=888, n_jobs=-1)
-        model.fit(X, y)
+        X = df_train[CALENDAR_FEATURES]
+        y = df_train['Order_Demand']
 
-        joblib.dump({'model': model, 'codes': viable_products}, self.model_path)
-        self.model = model
-        self.unique_product_codes = viable_products
+        progress(30, f'Fitting on {len(X)} rows')
+        model = self._backend(backend, n_jobs).fit(X, y)
+        progress(80, 'Publishing model')
+
+        self._publish({
+            'model': model,
+            'backend': model.name,
+            'codes': viable_products,
+            'code_index': code_index,
+            'fallback': self._build_fallback(df_train),
+            'features': CALENDAR_FEATURES,
+            'source': 'csv',
+        })
+        return self._report(model, X, y)
+
+    def history_training_frame(self, full=False, min_days=5):
+        """
+        Daily sales history with lag features: (history, df_train, viable_products, code_index).
+        Only days since the last extraction are read from the database unless `full` is set.
+        """
+        history, fetched = SalesHistory().update(full=full)
+        logger.info('Fetched %d product-day rows, history has %d rows', fetched, len(history))
+        if history.empty:
+            raise ValueError("No delivered orders to train on")
+
+        active_days = history.groupby('product_code')['date'].nunique()
+        viable_products = sorted(active_days[active_days >= min_days].index.astype(str))
+        if not viable_products:
+            raise ValueError(f"No product has at least {min_days} days of delivered orders")
+
+        code_index = {code: i for i, code in enumerate(viable_products)}
+        df_train = build_features(history, code_index)
+        categories = history.drop_duplicates('product_code').set_index('product_code')['category']
+        df_train['Product_Category'] = df_train['product_code'].map(categories).fillna('').astype(str)
+        return history, df_train, viable_products, code_index
+
+    def train_from_history(self, full=False, min_days=5, backend=None, n_jobs=None, progress=None):
+        """Train on our own delivered orders (lag/rolling features) instead of the Kaggle CSV"""
+        progress = progress or _no_progress
+        progress(5, 'Extracting sales history')
+        history, df_train, viable_products, code_index = self.history_training_frame(full, min_days)
+
+        X = df_train[DB_FEATURES]
+        y = df_train['demand']
+
+        progress(30, f'Fitting on {len(X)} rows')
+        model = self._backend(backend, n_jobs).fit(X, y)
+        progress(80, 'Publishing model')
+
+        self._publish({
+            'model': model,
+            'backend': model.name,
+            'codes': viable_products,
+            'code_index': code_index,
+            'fallback': self._build_fallback(df_train, target='demand'),
+            'features': DB_FEATURES,
+            'product_state': latest_state(history, code_index),
+            'history_end': history['date'].max().date(),
+            'demand_scale': 1,
+            'source': 'db',
+        })
+        return self._report(model, X, y)
+
+    @staticmethod
+    def _backend(name, n_jobs):
+        return get_backend(name, n_jobs=n_jobs) if n_jobs else get_backend(name)
+
+    def _publish(self, artifact):
+        # Write next to the live file and rename over it: os.replace is atomic, so other
+        # processes see either the old artifact or the complete new one, never a partial pickle
+        tmp_path = f'{self.model_path}.{os.getpid()}.tmp'
+        try:
+            joblib.dump(artifact, tmp_path)
+            os.replace(tmp_path, self.model_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._apply_artifact(artifact)
+            self.model_version = self._file_digest()
+            self._loaded_signature = self._file_signature()
+
+    @staticmethod
+    def _report(model, X, y):
         y_pred = model.predict(X)
 
         r2 = r2_score(y, y_pred)
@@ -71,13 +226,7 @@ class DemandForecastAI:
         mae = mean_absolute_error(y, y_pred)
 
 
-        print("\n===== MODEL PERFORMANCE =====")
-
-        print(f"R² Score: {r2:.4f}")
-
-        print(f"MAE: {mae:.4f}")
-
-        print("================================\n")
+        logger.info('Model performance: R² %.4f, MAE %.4f', r2, mae)
 
         return {
 
@@ -88,26 +237,111 @@ class DemandForecastAI:
 
         }
 
-    def predict_product_demand(self, product_id_str):
+    @staticmethod
+    def _build_fallback(df_train, target='Order_Demand'):
+        """
+        Average demand per order line by day of week, globally and per product category.
+        Used for products that are not in the training set.
+        """
+        def profile(frame):
+            means = frame.groupby('day_of_week')[target].mean()
+            return means.reindex(range(7)).fillna(frame[target].mean()).round(4).tolist()
+
+        fallback = {'global': profile(df_train), 'categories': {}}
+        if 'Product_Category' in df_train:
+            for category, frame in df_train.groupby('Product_Category', observed=True):
+                fallback['categories'][str(category)] = profile(frame)
+        return fallback
+
+    def _model_index(self, product_id):
+        index = self.code_index.get(str(product_id))
+        if index is None and not self.fallback:
+            # Legacy artifact without fallback profiles: stable (non-randomized) hash
+            index = zlib.crc32(str(product_id).encode()) % len(self.unique_product_codes)
+        return index
+
+    def _fallback_category(self, category):
+        """
+        Key of a product's category in the fallback profiles.
+        Artifacts trained on our sales history are keyed by our category_id. Kaggle CSV
+        artifacts are keyed by Kaggle's Product_Category, which only matches through
+        settings.AI_FORECAST_CATEGORY_MAP; unmapped categories use the global profile.
+        """
+        if category is None:
+            return None
+        if self.source == 'csv':
+            category = getattr(settings, 'AI_FORECAST_CATEGORY_MAP', {}).get(str(category))
+        return str(category) if category is not None else None
+
+    def predict_matrix(self, product_ids, horizon=30, categories=None):
+        """
+        Raw daily predictions as an (n_products, horizon) array, from one model.predict call.
+
+        Products in the training set use their persisted model index. Others use the
+        day-of-week profile of their category (`categories` = {product_id: category code})
+        or, failing that, the global profile stored with the artifact.
+        """
+        categories = categories or {}
+        future_dates = pd.date_range(start=pd.Timestamp.now().normalize(), periods=horizon)
+        day_of_week = future_dates.dayofweek.to_numpy()
+
+        n_products = len(product_ids)
+        predictions = np.zeros((n_products, horizon))
+        indices = [self._model_index(product_id) for product_id in product_ids]
+        known_rows = np.array([i for i, index in enumerate(indices) if index is not None], dtype=int)
+
+        if len(known_rows):
+            n_known = len(known_rows)
+            # Row i * horizon + d = known product i on day d
+            features = pd.DataFrame({
+                'day_of_year': np.tile(future_dates.dayofyear.to_numpy(), n_known),
+                'day_of_week': np.tile(day_of_week, n_known),
+                'month': np.tile(future_dates.month.to_numpy(), n_known),
+                'product_code_int': np.repeat([indices[i] for i in known_rows], horizon),
+            })
+            if LAG_FEATURES[0] in self.features:
+                self._add_lag_features(features, [product_ids[i] for i in known_rows], future_dates)
+            predictions[known_rows] = self.model.predict(features[self.features]).reshape(n_known, horizon)
+
+        for i, index in enumerate(indices):
+            if index is None:
+                category = self._fallback_category(categories.get(product_ids[i]))
+                profile = self.fallback['categories'].get(category) or self.fallback['global']
+                predictions[i] = np.asarray(profile)[day_of_week]
+
+        return predictions
+
+    def _add_lag_features(self, features, product_ids, future_dates):
+        """Lag inputs for models trained on sales history, from the state saved at training time"""
+        horizon = len(future_dates)
+        states = [self.product_state.get(str(product_id), {}) for product_id in product_ids]
+        history_end = pd.Timestamp(self.history_end or future_dates[0] - pd.Timedelta(days=1))
+        # Row i * horizon + d = product i on day d, as in predict_matrix
+        lags = frozen_lag_features(np.repeat(states, horizon), history_end, np.tile(future_dates, len(states)))
+        for name in LAG_FEATURES:
+            features[name] = lags[name].to_numpy()
+
+    def scale_forecast(self, raw_totals):
+        """Convert summed raw predictions into the forecast unit shown to users"""
+        return np.maximum(5, np.trunc(np.trunc(raw_totals) / self.demand_scale)).astype(int)
+
+    def predict_many(self, product_ids, horizon=30, categories=None):
+        """
+        Forecast total demand over `horizon` days for many products with one model.predict call.
+        Returns {product_id: forecast}.
+        """
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
         if not self.model or not self.unique_product_codes:
-            return 0
-
-        num_trained = len(self.unique_product_codes)
-        mapped_idx = abs(hash(product_id_str)) % num_trained
-
-        future_dates = pd.date_range(start=pd.Timestamp.now(), periods=30)
-        future_df = pd.DataFrame({
-            'day_of_year': future_dates.dayofyear,
-            'day_of_week': future_dates.dayofweek,
-            'month': future_dates.month,
-            'product_code_int': mapped_idx
-        })
+            return {product_id: 0 for product_id in product_ids}
 
-        predictions = self.model.predict(future_df)
-        raw_demand = int(np.sum(predictions))
+        predictions = self.predict_matrix(product_ids, horizon, categories)
+        final_forecast = self.scale_forecast(predictions.sum(axis=1))
 
-        final_forecast = max(5, int(raw_demand / 100))
+        return dict(zip(product_ids, final_forecast.tolist()))
 
-        return final_forecast
+    def predict_product_demand(self, product_id_str, horizon=30):
+        return self.predict_many([product_id_str], horizon)[product_id_str]
 
 ai_engine = DemandForecastAI()
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Lag/rolling-window inputs of the sales-history model.
+
+Only numpy and pandas here, no Django models: the backtest worker processes import
+this module, and under the spawn/forkserver start methods they have no app registry.
+"""
+import numpy as np
+import pandas as pd
+
+LAG_FEATURES = ['lag_7', 'rolling_mean_7', 'rolling_mean_28']
+
+
+def latest_state(history, code_index):
+    """Last 7 daily values and rolling means per product, used as lag inputs at forecast time"""
+    wide = history.pivot_table(index='date', columns='product_code', values='demand', aggfunc='sum')
+    wide = wide.asfreq('D').fillna(0.0)
+    last_28 = wide.tail(28)
+    state = {}
+    for code in code_index:
+        if code not in wide:
+            continue
+        column = last_28[code].to_numpy()
+        state[code] = {
+            'last_7': np.pad(column[-7:], (7 - len(column[-7:]), 0)).round(4).tolist(),
+            'rolling_mean_7': float(column[-7:].mean()),
+            'rolling_mean_28': float(column.mean()),
+        }
+    return state
+
+
+def frozen_lag_features(states, history_end, dates):
+    """
+    Lag inputs for rows dated after `history_end`, using only what was known on that day.
+
+    `states` holds one latest_state() entry per row and `dates` the row's day. lag_7 is
+    known for the first 7 days; past that the last 7-day mean stands in for it. The
+    rolling means are held at their last value.
+    """
+    last_7 = np.array([state.get('last_7', [0.0] * 7) for state in states]).reshape(-1, 7)
+    mean_7 = np.array([state.get('rolling_mean_7', 0.0) for state in states])
+    mean_28 = np.array([state.get('rolling_mean_28', 0.0) for state in states])
+
+    # Position of (day - 7) inside last_7, whose final element is history_end
+    offsets = (pd.DatetimeIndex(dates) - pd.Timestamp(history_end)).days.to_numpy() - 1
+    known = (offsets >= 0) & (offsets < 7)
+
+    lag_7 = mean_7.copy()
+    lag_7[known] = last_7[known, offsets[known]]
+    return pd.DataFrame({'lag_7': lag_7, 'rolling_mean_7': mean_7, 'rolling_mean_28': mean_28})
@@ -0,0 +1,37 @@
+"""
+Lazy access to the AI models.
+
+torch/torchvision (image classifier) and pandas/sklearn (demand forecast) take seconds
+and hundreds of MB to import, so nothing imports them at module level: views and
+services call these accessors, and the heavy modules load on first real use.
+"""
+import threading
+
+from django.conf import settings
+
+
+def get_classifier():
+    """The process-wide GlobalImageClassifier, loaded on first call"""
+    from .vision_models import GlobalImageClassifier
+    return GlobalImageClassifier()
+
+
+def get_forecaster():
+    """The process-wide DemandForecastAI; the artifact itself is loaded by load_model()"""
+    from .forecasting import ai_engine
+    return ai_engine
+
+
+def warm_up():
+    """Load the models now instead of on the first request"""
+    get_classifier()
+    get_forecaster().load_model()
+
+
+def warm_up_in_background():
+    """
+    Called from wsgi.py when settings.AI_WARMUP_ON_START is set, so a new web worker
+    starts answering immediately and loads the models on a side thread.
+    """
+    if getattr(settings, 'AI_WARMUP_ON_START', False):
+        threading.Thread(target=warm_up, name='ai-warm-up', daemon=True).start()
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.backends import BACKENDS
+from apps.ai_models.backtest import run_backtest, summarize
+from apps.ai_models.features import CALENDAR_FEATURES, DB_FEATURES
+from apps.ai_models.forecasting import ai_engine
+
+
+class Command(BaseCommand):
+    help = 'Rolling-origin backtest of the demand model: accuracy, fit time, predict latency and size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['csv', 'db'], default='csv',
+                            help='Evaluate on the Kaggle CSV or on delivered orders in the database')
+        parser.add_argument('--warehouse', default='Whse_C', help='Warehouse partition (csv source)')
+        parser.add_argument('--folds', type=int, default=4, help='Number of rolling origins')
+        parser.add_argument('--horizon', type=int, default=30, help='Days forecast after each origin')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per fold)')
+        parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                            help='Model backend (default: settings.AI_FORECAST_BACKEND)')
+
+    def handle(self, *args, **options):
+        try:
+            if options['source'] == 'db':
+                _, df, _, _ = ai_engine.history_training_frame()
+                dates, X, y = df['date'], df[DB_FEATURES], df['demand']
+            else:
+                df, _, _ = ai_engine.csv_training_frame(options['warehouse'])
+                dates, X, y = df['Date'], df[CALENDAR_FEATURES], df['Order_Demand']
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Loading data failed: {str(e)}'))
+            return
+
+        results = run_backtest(dates, X, y, options['folds'], options['horizon'], options['workers'],
+                               options['backend'])
+
+        self.stdout.write(f"{'origin':<12}{'train':>9}{'test':>7}{'MAE':>11}{'naive MAE':>11}"
+                          f"{'fit s':>8}{'ms/1k':>8}{'size KB':>10}")
+        for r in results:
+            if 'mae' not in r:
+                self.stdout.write(f"{str(r['origin']):<12}{r['train_rows']:>9}{r['test_rows']:>7}  (skipped: no data)")
+                continue
+            self.stdout.write(f"{str(r['origin']):<12}{r['train_rows']:>9}{r['test_rows']:>7}{r['mae']:>11.2f}"
+                              f"{r['baseline_mae']:>11.2f}{r['fit_seconds']:>8.2f}{r['predict_ms_per_1k']:>8.2f}"
+                              f"{r['size_kb']:>10.0f}")
+
+        summary = summarize(results)
+        if not summary:
+            self.stdout.write(self.style.ERROR('No fold had both training and test data'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Mean MAE {summary['mae']:.2f} (naive {summary['baseline_mae']:.2f}), "
+            f"fit {summary['fit_seconds']:.2f}s, predict {summary['predict_ms_per_1k']:.2f} ms/1k rows, "
+            f"model {summary['size_kb']:.0f} KB"
+        ))
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+from django.core.management.base import BaseCommand
+from sklearn.metrics import mean_absolute_error
+
+from apps.ai_models.backends import BACKENDS, get_backend
+from apps.ai_models.backtest import measure_artifact
+from apps.ai_models.features import CALENDAR_FEATURES, DB_FEATURES
+from apps.ai_models.forecasting import ai_engine
+
+
+class Command(BaseCommand):
+    help = 'Compare forecast backends: artifact size, load time, RSS, batch predict throughput and MAE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['csv', 'db'], default='csv')
+        parser.add_argument('--warehouse', default='Whse_C')
+        parser.add_argument('--backend', action='append', dest='backends', choices=list(BACKENDS),
+                            help='Backend to include (repeatable, default: all)')
+        parser.add_argument('--batch', type=int, default=60_000,
+                            help='Rows per predict call (default: 2000 products x 30 days)')
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--holdout-days', type=int, default=30,
+                            help='Most recent days kept out of training to score MAE')
+
+    def handle(self, *args, **options):
+        try:
+            if options['source'] == 'db':
+                _, df, _, _ = ai_engine.history_training_frame()
+                dates, X, y = df['date'], df[DB_FEATURES], df['demand']
+            else:
+                df, _, _ = ai_engine.csv_training_frame(options['warehouse'])
+                dates, X, y = df['Date'], df[CALENDAR_FEATURES], df['Order_Demand']
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Loading data failed: {str(e)}'))
+            return
+
+        cutoff = dates.max().normalize() - np.timedelta64(options['holdout_days'] - 1, 'D')
+        train = (dates < cutoff).to_numpy()
+        batch = X.sample(options['batch'], replace=True, random_state=888).reset_index(drop=True)
+
+        self.stdout.write(f"{'backend':<24}{'size KB':>10}{'fit s':>8}{'load ms':>9}{'RSS MB':>8}"
+                          f"{'rows/s':>12}{'MAE':>11}")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in options['backends'] or list(BACKENDS):
+                started = time.perf_counter()
+                model = get_backend(name).fit(X[train], y[train])
+                fit_seconds = time.perf_counter() - started
+                mae = mean_absolute_error(y[~train], model.predict(X[~train])) if (~train).any() else float('nan')
+
+                path = os.path.join(tmp_dir, f'{name}.pkl')
+                joblib.dump(model, path)
+                del model
+
+                # A new process per backend so load time and RSS are not skewed by earlier runs;
+                # measure_artifact lives in a module the worker can import without Django set up
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    load_seconds, rss_delta, throughput = pool.submit(
+                        measure_artifact, path, batch, options['rounds']).result()
+
+                self.stdout.write(f"{name:<24}{os.path.getsize(path) / 1024:>10.0f}{fit_seconds:>8.2f}"
+                                  f"{load_seconds * 1000:>9.1f}{rss_delta:>8.1f}{throughput:>12,.0f}{mae:>11.2f}")
@@ -0,0 +1,58 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.batching import MicroBatcher
+from apps.ai_models.loader import get_classifier
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request and micro-batched image classification under concurrent load'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Total classifications per mode')
+        parser.add_argument('--concurrency', type=int, default=8, help='Simultaneous callers')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'AI_IMAGE_BATCH_SIZE', 8))
+        parser.add_argument('--delay-ms', type=float, default=getattr(settings, 'AI_IMAGE_BATCH_DELAY_MS', 5))
+
+    def handle(self, *args, **options):
+        classifier = get_classifier()
+        if classifier._model is None:
+            self.stdout.write(self.style.ERROR('Model failed to load'))
+            return
+
+        image_dir = os.path.join(settings.MEDIA_ROOT, 'test_data')
+        images = []
+        for name in sorted(os.listdir(image_dir)):
+            with open(os.path.join(image_dir, name), 'rb') as f:
+                images.append(f.read())
+
+        batcher = MicroBatcher(classifier.classify_batch, options['batch_size'], options['delay_ms'] / 1000)
+        modes = {
+            'per-request': lambda tensor: classifier.classify_batch([tensor])[0],
+            'micro-batched': batcher.submit,
+        }
+
+        for mode, classify in modes.items():
+            def call(i):
+                started = time.perf_counter()
+                classify(classifier.prepare(io.BytesIO(images[i % len(images)])))
+                return time.perf_counter() - started
+
+            # Warm-up outside the timed section
+            call(0)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                latencies = np.array(list(pool.map(call, range(options['requests'])))) * 1000
+            elapsed = time.perf_counter() - started
+
+            line = (f"{mode:<14} {options['requests'] / elapsed:8.1f} img/s   "
+                    f"p50 {np.percentile(latencies, 50):7.1f} ms   p95 {np.percentile(latencies, 95):7.1f} ms")
+            if mode == 'micro-batched':
+                line += f'   avg batch {batcher.average_batch_size:.1f}'
+            self.stdout.write(line)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import time
+
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.loader import get_classifier
+from apps.ai_models.vision_models import (build_eager_model, compiled_model_path, export_compiled_model,
+                                          find_compiled_model)
+
+
+def measure(model, batch, rounds):
+    """Mean single-image latency (ms), batched throughput (img/s) and top-1 classes"""
+    with torch.inference_mode():
+        model(batch[:1])
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for image in batch:
+                model(image.unsqueeze(0))
+        latency = (time.perf_counter() - started) * 1000 / (rounds * len(batch))
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            output = model(batch)
+        throughput = rounds * len(batch) / (time.perf_counter() - started)
+    return latency, throughput, output.argmax(dim=1)
+
+
+class Command(BaseCommand):
+    help = 'Compare the eager float32 and exported TorchScript/int8 image models on media/test_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10)
+        parser.add_argument('--batch', type=int, default=16, help='Images per batched forward pass')
+
+    def handle(self, *args, **options):
+        classifier = get_classifier()
+        image_dir = os.path.join(settings.MEDIA_ROOT, 'test_data')
+        names = sorted(os.listdir(image_dir))
+        images = []
+        for name in names:
+            with open(os.path.join(image_dir, name), 'rb') as f:
+                images.append(classifier.prepare(f))
+        batch = torch.stack([images[i % len(images)] for i in range(max(options['batch'], len(images)))])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = find_compiled_model()
+            if path is None:
+                self.stdout.write(f'{compiled_model_path()} not found, exporting a temporary copy')
+                path = export_compiled_model(os.path.join(tmp_dir, 'model.pt'))
+            compiled_label = 'torchscript fp32' if path == compiled_model_path(quantize=False) else 'torchscript int8'
+            candidates = {
+                'eager float32': build_eager_model(),
+                compiled_label: torch.jit.load(path, map_location='cpu'),
+            }
+
+            results = {}
+            for label, model in candidates.items():
+                results[label] = measure(model, batch, options['rounds'])
+                latency, throughput, _ = results[label]
+                self.stdout.write(f'{label:<18} {latency:7.1f} ms/img   {throughput:7.1f} img/s (batch {len(batch)})')
+
+        eager_top1 = results['eager float32'][2][:len(images)]
+        compiled_top1 = results[compiled_label][2][:len(images)]
+        agree = (eager_top1 == compiled_top1).tolist()
+        for name, same, idx in zip(names, agree, compiled_top1.tolist()):
+            label = classifier._labels[idx] if classifier._labels and idx < len(classifier._labels) else idx
+            self.stdout.write(f'  {name}: {label} {"(same)" if same else "(DIFFERENT from eager)"}')
+        self.stdout.write(self.style.SUCCESS(f'Top-1 agreement: {sum(agree)}/{len(agree)}'))
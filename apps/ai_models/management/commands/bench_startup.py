@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand
+
+HEAVY_MODULES = ('torch', 'torchvision', 'pandas', 'sklearn', 'joblib')
+
+# Each scenario runs in a fresh interpreter so imports and RSS start from zero
+PROBE = '''
+import json, os, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+scenario = sys.argv[1]
+if scenario == 'eager':
+    from apps.ai_models.forecasting import ai_engine
+    from apps.ai_models.vision_models import GlobalImageClassifier
+    GlobalImageClassifier()
+elif scenario == 'warm':
+    from apps.ai_models.loader import warm_up
+    warm_up()
+elapsed = time.perf_counter() - started
+rss = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss = int(line.split()[1]) / 1024
+print(json.dumps({'seconds': elapsed, 'rss_mb': rss,
+                  'heavy': [m for m in %r if m in sys.modules]}))
+''' % (HEAVY_MODULES,)
+
+SCENARIOS = {
+    'lazy': 'django.setup() + URLconf, models untouched (what every worker/command now pays)',
+    'eager': 'same, plus importing and building the AI models (the old import-time cost)',
+    'warm': 'same, plus loader.warm_up() (a worker with AI_WARMUP_ON_START)',
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure process startup time and RSS with lazy vs eager loading of the AI models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario (best time is reported)')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'inventorySystem.settings')}
+        for scenario, description in SCENARIOS.items():
+            runs = []
+            for _ in range(options['repeat']):
+                output = subprocess.run([sys.executable, '-c', PROBE, scenario], env=env, cwd=os.getcwd(),
+                                        capture_output=True, text=True, check=True).stdout
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+
+            best = min(runs, key=lambda run: run['seconds'])
+            self.stdout.write(f"{scenario:<6} {best['seconds']:6.2f}s  {best['rss_mb']:7.1f} MB  "
+                              f"heavy modules: {', '.join(best['heavy']) or 'none'}")
+            self.stdout.write(f'       {description}')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.embeddings import product_index
+
+
+class Command(BaseCommand):
+    help = 'Build or update the product image embedding index used to match uploads to products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every embedding')
+        parser.add_argument('--batch-size', type=int, default=32)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            embedded, removed = product_index.sync(full=options['full'], batch_size=options['batch_size'])
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Building embeddings failed: {str(e)}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Embedded {embedded}, removed {removed}, index has {len(product_index)} products '
+            f'({time.perf_counter() - started:.1f}s): {product_index.path}'
+        ))
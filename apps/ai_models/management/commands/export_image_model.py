@@ -0,0 +1,29 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.vision_models import compiled_model_path, export_compiled_model
+
+
+class Command(BaseCommand):
+    help = 'Export the product image classifier as a TorchScript model with dynamic int8 quantization'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help=f'Output file (default: {compiled_model_path()}, '
+                                 f'or {compiled_model_path(quantize=False)} with --no-quantize)')
+        parser.add_argument('--no-quantize', action='store_true', help='Export float32 TorchScript only')
+
+    def handle(self, *args, **options):
+        try:
+            started = time.perf_counter()
+            path = export_compiled_model(options['output'], quantize=not options['no_quantize'])
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Export failed: {str(e)}'))
+            return
+
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        self.stdout.write(self.style.SUCCESS(
+            f'Exported {path} ({size_mb:.1f} MB) in {time.perf_counter() - started:.1f}s. '
+            'Restart the web workers to pick it up.'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.ai_models.datasets import DemandDataset
+from apps.ai_models.forecasting import ai_engine
+
+
+class Command(BaseCommand):
+    help = 'Convert the raw demand CSV into the cleaned per-warehouse columnar cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild even if the cache is up to date')
+        parser.add_argument('--chunk-size', type=int, default=None, help='CSV rows read per chunk')
+
+    def handle(self, *args, **options):
+        dataset = DemandDataset(ai_engine.dataset_path)
+        if options['chunk_size']:
+            dataset.chunk_size = options['chunk_size']
+
+        try:
+            if dataset.is_fresh() and not options['force']:
+                self.stdout.write(self.style.SUCCESS(f'Cache is up to date: {dataset.cache_dir}'))
+                return
+
+            started = time.perf_counter()
+            rows = dataset.build()
+        except Exception as e:
+            raise CommandError(f'Preparing dataset failed: {str(e)}')
+
+        for warehouse, count in sorted(rows.items()):
+            self.stdout.write(f'{warehouse}: {count} rows')
+        self.stdout.write(self.style.SUCCESS(f'Built cache in {time.perf_counter() - started:.1f}s: {dataset.cache_dir}'))
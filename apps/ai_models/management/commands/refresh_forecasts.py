@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.services import refresh_forecasts, FORECAST_HORIZONS
+
+
+class Command(BaseCommand):
+    help = 'Recompute and store demand forecasts for all active products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, action='append', dest='horizons',
+                            help=f'Forecast horizon in days (repeatable, default: {FORECAST_HORIZONS})')
+
+    def handle(self, *args, **options):
+        try:
+            written = refresh_forecasts(options['horizons'] or FORECAST_HORIZONS)
+            self.stdout.write(self.style.SUCCESS(f'Stored {written} forecasts!'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Forecast refresh failed: {str(e)}'))
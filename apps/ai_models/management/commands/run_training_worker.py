@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ai_models.services import claim_next_job, run_training_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued demand model training jobs and keep the image embedding index current'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process queued jobs and exit')
+        parser.add_argument('--poll', type=float, default=10, help='Seconds between queue checks')
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                self.sync_embeddings()
+                if options['once']:
+                    return
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write(f'Training job #{job.pk} ({job.source}, {job.cores} cores)...')
+            if run_training_job(job):
+                self.stdout.write(self.style.SUCCESS(f'Job #{job.pk} succeeded'))
+            else:
+                job.refresh_from_db()
+                self.stdout.write(self.style.ERROR(f'Job #{job.pk} failed: {job.message}'))
+
+    def sync_embeddings(self):
+        """Re-embed products whose image changed since the last pass, off the web workers"""
+        if not getattr(settings, 'AI_EMBEDDINGS_AUTO_UPDATE', False):
+            return
+        from apps.ai_models.embeddings import product_index
+        try:
+            embedded, removed = product_index.sync()
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Updating image embeddings failed: {str(e)}'))
+            return
+        if embedded or removed:
+            self.stdout.write(f'Image embeddings: {embedded} updated, {removed} removed')
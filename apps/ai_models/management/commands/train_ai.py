@@ -1,12 +1,43 @@
 from django.core.management.base import BaseCommand
+from apps.ai_models.backends import BACKENDS
 from apps.ai_models.forecasting import ai_engine
+from apps.ai_models.services import refresh_forecasts, enqueue_training
 
 class Command(BaseCommand):
     help = 'Train Data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=['csv', 'db'], default='csv',
+                            help='Train on the Kaggle CSV or on delivered orders in the database')
+        parser.add_argument('--full', action='store_true',
+                            help='With --source db: re-extract the whole sales history instead of appending new days')
+        parser.add_argument('--backend', choices=list(BACKENDS), default=None,
+                            help='Model backend (default: settings.AI_FORECAST_BACKEND)')
+        parser.add_argument('--warehouse', default='Whse_C', help='Warehouse partition to train on')
+        parser.add_argument('--cores', type=int, default=None,
+                            help='CPU cores to use (default: all, or settings.AI_TRAINING_CORES with --background)')
+        parser.add_argument('--background', action='store_true',
+                            help='Queue a training job for run_training_worker instead of training now')
+        parser.add_argument('--skip-forecasts', action='store_true',
+                            help='Do not refresh the stored forecasts after training')
+
     def handle(self, *args, **kwargs):
+        if kwargs['background']:
+            job = enqueue_training(source=kwargs['source'], warehouse=kwargs['warehouse'],
+                                   backend=kwargs['backend'], full=kwargs['full'], cores=kwargs['cores'])
+            self.stdout.write(self.style.SUCCESS(f'Queued training job #{job.pk} ({job.cores} cores)'))
+            return
+
         try:
-            ai_engine.train()
+            if kwargs['source'] == 'db':
+                ai_engine.train_from_history(full=kwargs['full'], backend=kwargs['backend'], n_jobs=kwargs['cores'])
+            else:
+                ai_engine.train(warehouse=kwargs['warehouse'], backend=kwargs['backend'], n_jobs=kwargs['cores'])
             self.stdout.write(self.style.SUCCESS('Successfully trained AI model!'))
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Training failed: {str(e)}'))
\ No newline at end of file
+            self.stdout.write(self.style.ERROR(f'Training failed: {str(e)}'))
+            return
+
+        if not kwargs['skip_forecasts']:
+            written = refresh_forecasts()
+            self.stdout.write(self.style.SUCCESS(f'Stored {written} forecasts!'))
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from apps.catalog.models import Product
+
+
+class ProductForecast(models.Model):
+    """Dự báo nhu cầu được tính sẵn bởi train_ai / refresh_forecasts"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='forecasts')
+    horizon = models.PositiveSmallIntegerField()
+    predicted_demand = models.IntegerField(default=0)
+    daily_demand = models.JSONField(default=list, blank=True)
+    model_version = models.CharField(max_length=64)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'horizon'], name='unique_product_forecast_horizon'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} - {self.horizon}d: {self.predicted_demand}'
+
+    @property
+    def is_stale(self):
+        max_age = timedelta(hours=getattr(settings, 'AI_FORECAST_STALE_HOURS', 24))
+        return timezone.now() - self.computed_at > max_age
+
+
+class TrainingJob(models.Model):
+    """Một lần huấn luyện lại mô hình dự báo, chạy nền bởi run_training_worker"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    SOURCE_CHOICES = [
+        ('csv', 'Historical CSV'),
+        ('db', 'Sales history'),
+    ]
+
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='csv')
+    warehouse = models.CharField(max_length=50, default='Whse_C')
+    backend = models.CharField(max_length=50, blank=True)
+    full = models.BooleanField(default=False)
+    cores = models.PositiveSmallIntegerField(default=1)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    metrics = models.JSONField(default=dict, blank=True)
+    model_version = models.CharField(max_length=64, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the worker while the job runs; a running job without it is reaped
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='trainingjob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'Training #{self.pk} ({self.status})'
+
+    @property
+    def is_active(self):
+        return self.status in ('queued', 'running')
@@ -0,0 +1,93 @@
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from apps.authentication.shared_cache import is_shared
+
+
+class ResultCache:
+    """
+    Two-level cache for model results: a bounded in-process LRU in front of Django's cache.
+
+    The LRU answers repeats within one worker without any I/O; the shared cache lets other
+    workers (or terminals hitting another worker) reuse the result. Hit/miss counters are
+    kept both per process and in the shared cache. Without a shared cache backend
+    (LocMemCache) only the per-process level is used and no cross-worker stats exist.
+    """
+
+    def __init__(self, prefix, max_entries=256, timeout=86400):
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared = is_shared()
+
+    def _count(self, name):
+        if not self.shared:
+            return
+        key = f'{self.prefix}:stats:{name}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+        if value is not None:
+            self._count('local_hits')
+            return value
+
+        value = cache.get(f'{self.prefix}:{key}') if self.shared else None
+        if value is not None:
+            self.shared_hits += 1
+            self._count('shared_hits')
+            self._remember(key, value)
+            return value
+
+        self.misses += 1
+        self._count('misses')
+        return None
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if self.shared:
+            cache.set(f'{self.prefix}:{key}', value, self.timeout)
+
+    def stats(self):
+        def summary(local_hits, shared_hits, misses):
+            total = local_hits + shared_hits + misses
+            return {
+                'local_hits': local_hits,
+                'shared_hits': shared_hits,
+                'misses': misses,
+                'hit_rate': round((local_hits + shared_hits) / total, 4) if total else 0,
+            }
+
+        process = {**summary(self.local_hits, self.shared_hits, self.misses), 'entries': len(self._entries),
+                   'max_entries': self.max_entries}
+        if not self.shared:
+            return {'process': process, 'all_workers': None}
+
+        shared = cache.get_many([f'{self.prefix}:stats:{name}' for name in ('local_hits', 'shared_hits', 'misses')])
+        return {
+            'process': process,
+            'all_workers': summary(*(shared.get(f'{self.prefix}:stats:{name}', 0)
+                                     for name in ('local_hits', 'shared_hits', 'misses'))),
+        }
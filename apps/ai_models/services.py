@@ -0,0 +1,162 @@
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.catalog.models import Product
+from .loader import get_forecaster
+from .models import ProductForecast, TrainingJob
+
+FORECAST_HORIZONS = (7, 14, 30)
+
+
+def refresh_forecasts(horizons=FORECAST_HORIZONS, batch_size=2000):
+    """
+    Tính lại dự báo cho toàn bộ sản phẩm đang bán và lưu vào ProductForecast.
+
+    The model is run once per batch of products for the longest horizon; shorter
+    horizons are prefix sums of the same predictions. Returns the number of rows written.
+    """
+    ai_engine = get_forecaster()
+    if not ai_engine.load_model():
+        raise RuntimeError('Forecast model is not trained yet. Run "manage.py train_ai" first.')
+
+    horizons = sorted(set(int(h) for h in horizons))
+    max_horizon = horizons[-1]
+    computed_at = timezone.now()
+    products = list(Product.objects.filter(is_active=True).order_by('id')
+                    .values_list('id', 'product_id', 'category__category_id'))
+
+    written = 0
+    for start in range(0, len(products), batch_size):
+        batch = products[start:start + batch_size]
+        codes = [str(code) for _, code, _ in batch]
+        categories = {str(code): category for _, code, category in batch}
+        daily = ai_engine.predict_matrix(codes, max_horizon, categories)
+        cumulative = daily.cumsum(axis=1)
+        daily_display = (daily / ai_engine.demand_scale).round(1)
+
+        rows = []
+        for horizon in horizons:
+            totals = ai_engine.scale_forecast(cumulative[:, horizon - 1])
+            for i, (product_pk, _, _) in enumerate(batch):
+                rows.append(ProductForecast(
+                    product_id=product_pk,
+                    horizon=horizon,
+                    predicted_demand=int(totals[i]),
+                    daily_demand=daily_display[i, :horizon].tolist(),
+                    model_version=ai_engine.model_version,
+                    computed_at=computed_at,
+                ))
+
+        ProductForecast.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['product', 'horizon'],
+            update_fields=['predicted_demand', 'daily_demand', 'model_version', 'computed_at'],
+        )
+        written += len(rows)
+
+    ProductForecast.objects.exclude(product__is_active=True).delete()
+    ProductForecast.objects.exclude(horizon__in=horizons).delete()
+    return written
+
+
+def training_cores():
+    return max(1, int(getattr(settings, 'AI_TRAINING_CORES', 1)))
+
+
+def enqueue_training(user=None, source='csv', warehouse='Whse_C', backend='', full=False, cores=None):
+    """Xếp một lần huấn luyện vào hàng đợi; run_training_worker sẽ chạy nó"""
+    return TrainingJob.objects.create(
+        source=source, warehouse=warehouse, backend=backend or '', full=full,
+        cores=cores or training_cores(), created_by=user,
+    )
+
+
+def training_lease():
+    return timedelta(seconds=int(getattr(settings, 'AI_TRAINING_LEASE_SECONDS', 300)))
+
+
+def reap_stale_jobs():
+    """Mark running jobs whose worker stopped sending heartbeats as failed. Returns how many."""
+    now = timezone.now()
+    cutoff = now - training_lease()
+    stale = Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    return TrainingJob.objects.filter(stale, status='running').update(
+        status='failed', message='Worker stopped responding', finished_at=now,
+    )
+
+
+def claim_next_job():
+    """
+    Take the oldest queued job. The conditional UPDATE only succeeds for one worker,
+    so several workers can poll the same queue safely.
+    """
+    reap_stale_jobs()
+    for job in TrainingJob.objects.filter(status='queued').order_by('created_at')[:5]:
+        now = timezone.now()
+        claimed = TrainingJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, progress=0, message='Starting',
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+    return None
+
+
+def _heartbeat(job_id, stop, interval):
+    # Keeps the lease while a single long fit() call reports no progress
+    try:
+        while not stop.wait(interval):
+            TrainingJob.objects.filter(pk=job_id, status='running').update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def run_training_job(job):
+    """Train, publish the artifact and refresh stored forecasts, recording progress on the job"""
+    from threadpoolctl import threadpool_limits
+
+    ai_engine = get_forecaster()
+
+    def progress(percent, message):
+        TrainingJob.objects.filter(pk=job.pk, status='running').update(
+            progress=percent, message=message[:255], heartbeat_at=timezone.now(),
+        )
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(job.pk, stop, training_lease().total_seconds() / 5), daemon=True,
+    )
+    heartbeat.start()
+    try:
+        # Cap joblib workers and the OpenMP/BLAS threads inside sklearn to the job's core budget
+        with threadpool_limits(limits=job.cores):
+            if job.source == 'db':
+                metrics = ai_engine.train_from_history(full=job.full, backend=job.backend or None,
+                                                       n_jobs=job.cores, progress=progress)
+            else:
+                metrics = ai_engine.train(warehouse=job.warehouse, backend=job.backend or None,
+                                          n_jobs=job.cores, progress=progress)
+            progress(90, 'Refreshing stored forecasts')
+            written = refresh_forecasts()
+    except Exception as e:
+        TrainingJob.objects.filter(pk=job.pk, status='running').update(
+            status='failed', message=str(e)[:255], finished_at=timezone.now(),
+        )
+        return False
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    # status='running': a job reaped while it was training keeps the reaper's verdict
+    updated = TrainingJob.objects.filter(pk=job.pk, status='running').update(
+        status='succeeded', progress=100, message=f'Stored {written} forecasts',
+        metrics={key: round(float(value), 4) for key, value in metrics.items()},
+        model_version=ai_engine.model_version or '', finished_at=timezone.now(),
+    )
+    return bool(updated)
@@ -1,3 +1,132 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from sklearn.ensemble import RandomForestRegressor
+
+from apps.catalog.models import Category, Product
+
+from .backends import QuantizedForestBackend
+from .datasets import DemandDataset
+from .embeddings import ProductEmbeddingIndex
+from .models import TrainingJob
+from .services import run_training_job
+
+
+class DemandDatasetTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.csv = os.path.join(self.tmp, 'demand.csv')
+        with open(self.csv, 'w') as f:
+            f.write('Product_Code,Warehouse,Product_Category,Date,Order_Demand\n')
+            for day in range(1, 29):
+                f.write(f'P1,Whse_A,Category_001,2016/1/{day},({day * 100})\n')
+                f.write(f'P2,Whse_B,Category_002,2016/1/{day},{day}\n')
+
+    def test_load_returns_typed_rows_of_one_warehouse(self):
+        df = DemandDataset(self.csv, chunk_size=10).load('Whse_A')
+
+        self.assertEqual(len(df), 28)
+        self.assertEqual(df['Order_Demand'].max(), 2800)
+        self.assertEqual(df['Date'].dt.day.max(), 28)
+
+    def test_unknown_warehouse_raises(self):
+        with self.assertRaisesMessage(ValueError, "Warehouse 'Whse_X' not found"):
+            DemandDataset(self.csv).load('Whse_X')
+
+    def test_concurrent_builds_do_not_break_each_other(self):
+        errors = []
+
+        def build():
+            try:
+                DemandDataset(self.csv, chunk_size=5).build()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=build) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        dataset = DemandDataset(self.csv)
+        self.assertTrue(dataset.is_fresh())
+        self.assertEqual(len(dataset.load('Whse_B')), 28)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.tmp, 'cache'))), ['demand'])
+
+
+class QuantizedForestBackendTests(SimpleTestCase):
+    def test_predictions_match_sklearn_for_large_targets(self):
+        rng = np.random.default_rng(0)
+        X = rng.random((500, 4))
+        y = 200000 + 50000 * X[:, 0] + rng.normal(0, 100, 500)
+
+        backend = QuantizedForestBackend(n_estimators=5, max_depth=6, n_jobs=1).fit(X, y)
+        forest = RandomForestRegressor(n_estimators=5, max_depth=6, min_samples_leaf=2, random_state=888,
+                                       n_jobs=1).fit(X, y)
+
+        predicted = backend.predict(X)
+        self.assertTrue(np.isfinite(predicted).all())
+        np.testing.assert_allclose(predicted, forest.predict(X), rtol=1e-5)
+
+
+class TrainingJobTests(TestCase):
+    def test_job_reaped_during_training_stays_failed(self):
+        job = TrainingJob.objects.create(status='running', cores=1)
+
+        def train(**kwargs):
+            # The reaper gave up on the job while fit() was running
+            TrainingJob.objects.filter(pk=job.pk).update(status='failed', message='Worker stopped responding')
+            return {'r2': 0.5, 'mae': 1.0}
+
+        engine = mock.Mock(model_version='v1')
+        engine.train.side_effect = train
+        with mock.patch('apps.ai_models.services.get_forecaster', return_value=engine), \
+                mock.patch('apps.ai_models.services.refresh_forecasts', return_value=3):
+            self.assertFalse(run_training_job(job))
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.message), ('failed', 'Worker stopped responding'))
+
+
+class ProductEmbeddingIndexTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.index = ProductEmbeddingIndex(os.path.join(self.tmp, 'models', 'index.npz'))
+
+    def test_search_ignores_k_below_one(self):
+        self.index._index = (np.arange(3), np.array(['a', 'b', 'c']), np.eye(3, dtype=np.float32))
+
+        self.assertEqual(self.index.search([1, 0, 0], k=0), [])
+        self.assertEqual(self.index.search([1, 0, 0], k=-1), [])
+        self.assertEqual(self.index.search([1, 0, 0], k=1), [(0, 1.0)])
+
+    def test_unreadable_image_is_not_retried_until_it_changes(self):
+        category = Category.objects.create(category_id='C1', name='Category')
+        product = Product.objects.create(product_id='P1', name='Mouse', category=category, unit='pc',
+                                         price='10.00', image='products/missing.jpg')
+
+        with mock.patch('apps.ai_models.loader.get_classifier') as get_classifier, \
+                self.assertLogs('apps.ai_models.embeddings', 'WARNING'):
+            self.assertEqual(self.index.sync(), (0, 0))
+        self.assertEqual(self.index.failed, {product.pk: 'products/missing.jpg'})
+        self.assertEqual(get_classifier.call_count, 1)
+
+        # A fresh process reads the recorded failure back from the file
+        index = ProductEmbeddingIndex(self.index.path)
+        with mock.patch('apps.ai_models.loader.get_classifier') as get_classifier:
+            self.assertEqual(index.sync(), (0, 0))
+        get_classifier.assert_not_called()
+
+        Product.objects.filter(pk=product.pk).update(image='products/other.jpg')
+        with mock.patch('apps.ai_models.loader.get_classifier') as get_classifier, \
+                self.assertLogs('apps.ai_models.embeddings', 'WARNING'):
+            index.sync()
+        self.assertEqual(index.failed, {product.pk: 'products/other.jpg'})
@@ -4,4 +4,9 @@ from . import views
 
 urlpatterns = [
     path('api/classify-upload/', views.api_auto_fill_product, name='api_classify_upload'),
+    path('api/classify-cache/stats/', views.classify_cache_stats, name='classify_cache_stats'),
+    path('api/match-product/', views.api_match_product, name='api_match_product'),
+    path('forecast/', views.demand_forecast, name='demand_forecast'),
+    path('training/status/', views.training_status, name='training_status'),
+    path('training/start/', views.start_training, name='start_training'),
 ]
\ No newline at end of file
@@ -1,12 +1,19 @@
 # Trong views.py
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
+from django.shortcuts import render, redirect
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 
-from apps.ai_models.vision_models import GlobalImageClassifier
-
-# Khởi tạo model (Toàn cục)
-ai_classifier = GlobalImageClassifier()
-
+from apps.authentication.views import user_role
+from apps.catalog.models import Product
+from apps.inventory.models import Inventory
+from .loader import get_classifier
+from .models import ProductForecast, TrainingJob
+from .services import FORECAST_HORIZONS, enqueue_training, reap_stale_jobs
 
 @csrf_exempt  # Hoặc bạn có thể gửi CSRF token từ JS (khuyên dùng cách có Token bên dưới)
 def api_auto_fill_product(request):
@@ -14,8 +21,141 @@ def api_auto_fill_product(request):
     if request.method == 'POST' and request.FILES.get('image'):
         uploaded_file = request.FILES['image']
 
-        result = ai_classifier.predict_from_file_object(uploaded_file)
+        # MobileNet được tải ở lần gọi đầu tiên, không phải lúc import views
+        result = get_classifier().predict_from_file_object(uploaded_file)
 
         return JsonResponse(result)
 
-    return JsonResponse({'success': False, 'error': 'No image provided'})
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'No image provided'})
+
+
+@login_required
+@user_role(['admin'])
+def classify_cache_stats(request):
+    """Tỉ lệ trúng cache của API phân loại ảnh (tiến trình hiện tại và toàn bộ worker)"""
+    return JsonResponse(get_classifier().cache_stats())
+
+
+@login_required
+def api_match_product(request):
+    """API nhận ảnh, trả về các sản phẩm có ảnh giống nhất trong danh mục"""
+    if request.method != 'POST' or not request.FILES.get('image'):
+        return JsonResponse({'success': False, 'error': 'No image provided'})
+
+    try:
+        k = max(1, min(int(request.POST.get('k', 5)), 20))
+    except ValueError:
+        k = 5
+
+    from .embeddings import product_index
+    try:
+        classifier = get_classifier()
+        vector = classifier.embed_batch([classifier.prepare(request.FILES['image'])])[0]
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+    matches = product_index.search(vector, k)
+    products = Product.objects.in_bulk([product_id for product_id, _ in matches])
+    return JsonResponse({
+        'success': True,
+        'matches': [
+            {
+                'id': product_id,
+                'product_id': products[product_id].product_id,
+                'name': products[product_id].name,
+                'score': round(score, 4),
+            }
+            for product_id, score in matches if product_id in products
+        ],
+    })
+
+
+@login_required
+@user_role(['admin', 'warehouse'])
+def demand_forecast(request):
+    """Hiển thị dự báo đã tính sẵn - không chạy model trong request"""
+    products = Product.objects.filter(is_active=True).select_related('category').order_by('name')
+    selected, result = None, None
+
+    try:
+        days = int(request.POST.get('days', FORECAST_HORIZONS[0]))
+    except ValueError:
+        days = FORECAST_HORIZONS[0]
+
+    try:
+        product_id = int(request.POST.get('product_id', ''))
+    except ValueError:
+        product_id = None
+
+    if request.method == 'POST' and product_id is not None:
+        selected = products.filter(id=product_id).first()
+        forecast = ProductForecast.objects.filter(product=selected, horizon=days).first() if selected else None
+
+        if forecast:
+            current = Inventory.objects.filter(product=selected).values_list('quantity', flat=True).first() or 0
+            shortage = max(0, forecast.predicted_demand - current)
+            start = forecast.computed_at.date()
+            result = {
+                'total': forecast.predicted_demand,
+                'current': current,
+                'shortage': shortage,
+                'enough': shortage == 0,
+                'computed_at': forecast.computed_at,
+                'model_version': forecast.model_version,
+                'stale': forecast.is_stale,
+                'forecast': [
+                    {
+                        'date': (start + timedelta(days=i)).strftime('%d/%m/%Y'),
+                        'day': (start + timedelta(days=i)).strftime('%A'),
+                        'quantity': quantity,
+                    }
+                    for i, quantity in enumerate(forecast.daily_demand)
+                ],
+            }
+
+    return render(request, 'dashboard/forecast.html', {
+        'products': products,
+        'selected': selected,
+        'result': result,
+        'days': days,
+        'horizons': FORECAST_HORIZONS,
+    })
+
+
+def _job_payload(job):
+    return {
+        'id': job.pk,
+        'source': job.get_source_display(),
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'cores': job.cores,
+        'metrics': job.metrics,
+        'created_at': job.created_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@login_required
+@user_role(['admin'])
+def training_status(request):
+    """Trạng thái các lần huấn luyện gần nhất (dashboard admin gọi định kỳ khi có job đang chạy)"""
+    jobs = TrainingJob.objects.all()[:5]
+    return JsonResponse({'jobs': [_job_payload(job) for job in jobs]})
+
+
+@login_required
+@user_role(['admin'])
+@require_POST
+def start_training(request):
+    reap_stale_jobs()
+    if TrainingJob.objects.filter(status__in=['queued', 'running']).exists():
+        messages.warning(request, 'A training job is already queued or running!')
+        return redirect('dashboard')
+
+    source = request.POST.get('source', 'csv')
+    if source not in dict(TrainingJob.SOURCE_CHOICES):
+        source = 'csv'
+    job = enqueue_training(user=request.user, source=source)
+    messages.success(request, f'Training job #{job.pk} queued!')
+    return redirect('dashboard')
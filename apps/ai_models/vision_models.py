@@ -5,27 +5,90 @@ from PIL import Image
 import requests
 import json
 import os
+import hashlib
+import io
+import threading
 from django.conf import settings
 
+from .batching import MicroBatcher
+from .result_cache import ResultCache
+
+
+def compiled_model_path(quantize=True):
+    name = 'mobilenet_v2_int8.pt' if quantize else 'mobilenet_v2_fp32.pt'
+    return os.path.join(settings.MEDIA_ROOT, 'models', name)
+
+
+def find_compiled_model():
+    """The exported model to serve: int8 when both exist, None when neither does"""
+    for path in (compiled_model_path(quantize=True), compiled_model_path(quantize=False)):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def build_eager_model():
+    model = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.DEFAULT)
+    model.eval()
+    return model
+
+
+def export_compiled_model(path=None, quantize=True):
+    """
+    Trace MobileNetV2 to TorchScript and save it under media/models.
+
+    Dynamic int8 quantization covers the Linear classifier head (PyTorch's dynamic
+    quantization does not apply to convolutions); freezing folds BatchNorm into the
+    convolutions and inlines the weights, which is where most CPU time is saved.
+    """
+    path = path or compiled_model_path(quantize)
+    model = build_eager_model()
+    if quantize:
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, torch.rand(1, 3, 224, 224)))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        torch.jit.save(scripted, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
 
 class GlobalImageClassifier:
     _instance = None
+    _init_lock = threading.Lock()
     _model = None
     _labels = None
     _preprocess = None
+    _batcher = None
+    _feature_model = None
+    _results = None
+    model_kind = None
+    model_version = None
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(GlobalImageClassifier, cls).__new__(cls)
-            cls._instance.initialize_model()
+            # Background threads (warm-up, embedding updates) may get here at the same time as
+            # a request; publish the instance only once the model is loaded
+            with cls._init_lock:
+                if cls._instance is None:
+                    instance = super(GlobalImageClassifier, cls).__new__(cls)
+                    instance.initialize_model()
+                    cls._instance = instance
         return cls._instance
 
     def initialize_model(self):
         print("Loding MobileNetV2...")
         try:
 
-            self._model = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.DEFAULT)
-            self._model.eval()
+            self._model, self.model_kind = self.load_model()
+            self.model_version = self.current_model_version(self.model_kind)
 
             self._preprocess = transforms.Compose([
                 transforms.Resize(256),
@@ -35,10 +98,42 @@ class GlobalImageClassifier:
             ])
 
             self._labels = self.load_labels()
+
+            max_batch_size = getattr(settings, 'AI_IMAGE_BATCH_SIZE', 8)
+            if max_batch_size > 1:
+                max_delay = getattr(settings, 'AI_IMAGE_BATCH_DELAY_MS', 5) / 1000
+                timeout = getattr(settings, 'AI_IMAGE_BATCH_TIMEOUT_S', 30)
+                self._batcher = MicroBatcher(self.classify_batch, max_batch_size, max_delay, timeout)
+
+            self._results = ResultCache(
+                'image-classify',
+                max_entries=getattr(settings, 'AI_IMAGE_CACHE_SIZE', 256),
+                timeout=getattr(settings, 'AI_IMAGE_CACHE_TIMEOUT', 86400),
+            )
             print('Succefully!')
         except Exception as e:
             print('Error: {e}')
 
+    @staticmethod
+    def load_model():
+        """Use the exported TorchScript/int8 model when present, otherwise eager float32"""
+        path = find_compiled_model()
+        if getattr(settings, 'AI_IMAGE_USE_COMPILED', True) and path:
+            try:
+                return torch.jit.load(path, map_location='cpu'), 'torchscript'
+            except Exception as e:
+                print(f'Could not load {path}, falling back to eager mode: {e}')
+        return build_eager_model(), 'eager'
+
+    @staticmethod
+    def current_model_version(model_kind):
+        """Changes whenever a different model would answer, so cached results never outlive it"""
+        if model_kind == 'torchscript':
+            path = find_compiled_model()
+            stat = os.stat(path)
+            return f'torchscript-{os.path.basename(path)}-{stat.st_mtime_ns}-{stat.st_size}'
+        return f'eager-{models.MobileNet_V2_Weights.DEFAULT.name}'
+
     def load_labels(self):
         path = os.path.join(settings.BASE_DIR, 'media', 'models', 'imagenet_classes.json')
         os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -55,29 +150,64 @@ class GlobalImageClassifier:
         with open(path, 'r') as f:
             return json.load(f)
 
+    def prepare(self, file_obj):
+        """Decode and preprocess on the caller's thread; only the forward pass is batched"""
+        img = Image.open(file_obj).convert('RGB')
+        return self._preprocess(img)
+
+    def classify_batch(self, tensors):
+        """One forward pass for a list of preprocessed images, one result dict per image"""
+        with torch.inference_mode():
+            output = self._model(torch.stack(tensors))
+            probabilities = torch.nn.functional.softmax(output, dim=1)
+            scores, indices = torch.topk(probabilities, 1, dim=1)
+
+        results = []
+        for score, idx_val in zip(scores[:, 0].tolist(), indices[:, 0].tolist()):
+            name = self._labels[idx_val] if self._labels and idx_val < len(self._labels) else "Unknown"
+            results.append({
+                "success": True,
+                "product_name": name.title(),
+                "confidence": round(score * 100, 2)
+            })
+        return results
+
+    def embed_batch(self, tensors):
+        """Penultimate-layer (1280-d) MobileNetV2 features, L2-normalised, as a float32 array"""
+        if self._feature_model is None:
+            # The frozen TorchScript graph has no separate feature extractor
+            self._feature_model = (self._model if self.model_kind == 'eager' else build_eager_model()).features
+
+        with torch.inference_mode():
+            features = self._feature_model(torch.stack(tensors))
+            features = torch.nn.functional.adaptive_avg_pool2d(features, 1).flatten(1)
+            features = torch.nn.functional.normalize(features, dim=1)
+        return features.numpy()
+
     def predict_from_file_object(self, file_obj):
         if self._model is None:
             return {"success": False, "error": "Model failed to load"}
 
         try:
-            img = Image.open(file_obj).convert('RGB')
+            data = file_obj.read()
+            # Same bytes + same model = same answer: skip decode, preprocess and forward pass
+            cache_key = f'{self.model_version}:{hashlib.sha256(data).hexdigest()}'
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                return dict(cached)
 
-            input_tensor = self._preprocess(img).unsqueeze(0)
+            input_tensor = self.prepare(io.BytesIO(data))
 
-            with torch.no_grad():
-                output = self._model(input_tensor)
+            if self._batcher is not None:
+                result = self._batcher.submit(input_tensor)
+            else:
+                result = self.classify_batch([input_tensor])[0]
 
-            probabilities = torch.nn.functional.softmax(output[0], dim=0)
-            score, idx = torch.topk(probabilities, 1)
-
-            idx_val = idx.item()
-            name = self._labels[idx_val] if self._labels and idx_val < len(self._labels) else "Unknown"
-
-            return {
-                "success": True,
-                "product_name": name.title(),
-                "confidence": round(score.item() * 100, 2)
-            }
+            self._results.set(cache_key, result)
+            return dict(result)
 
         except Exception as e:
-            return {"success": False, "error": str(e)}
\ No newline at end of file
+            return {"success": False, "error": str(e)}
+
+    def cache_stats(self):
+        return {'model_version': self.model_version, **(self._results.stats() if self._results else {})}
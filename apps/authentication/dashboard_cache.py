@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .shared_cache import CacheVersion, is_shared
+
+VERSION_KEY = 'dashboard:version'
+HITS_KEY = 'dashboard:hits'
+MISSES_KEY = 'dashboard:misses'
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+_version = CacheVersion(VERSION_KEY)
+
+
+def current_version():
+    return _version.current()
+
+
+def bump_version():
+    """Invalidate every cached dashboard block once the write has committed"""
+    _version.bump()
+
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cached_block(role, name, builder, user_id=None, params=()):
+    """Return a dashboard context block from cache, building it on a miss"""
+    if not is_shared():
+        # Invalidation could not reach the other workers, so do not cache at all
+        return builder()
+    key = ':'.join(str(part) for part in (
+        'dashboard', current_version(), role, user_id or 'all', name, *params,
+    ))
+    value = cache.get(key)
+    if value is not None:
+        _count(HITS_KEY)
+        return value
+
+    _count(MISSES_KEY)
+    value = builder()
+    cache.set(key, value, _timeout())
+    return value
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'shared': is_shared(),
+        'version': current_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0,
+        'timeout': _timeout(),
+    }
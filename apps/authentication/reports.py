@@ -0,0 +1,119 @@
+from datetime import timedelta, datetime, time
+
+from django.db.models import Sum, Count, Q, DateField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from ..inventory.models import StockMovementDaily
+from ..sales.models import Order
+
+RANGE_CHOICES = (7, 30, 90, 180, 365)
+GRANULARITY_CHOICES = ('day', 'week', 'month')
+LABEL_FORMATS = {'day': '%d/%m', 'week': '%d/%m', 'month': '%m/%Y'}
+
+
+def bucket_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def report_period(request, default_days=7):
+    """Đọc ?range=&group= từ request, trả về (start, end, granularity)"""
+    try:
+        days = int(request.GET.get('range', default_days))
+    except (TypeError, ValueError):
+        days = default_days
+    if days not in RANGE_CHOICES:
+        days = default_days
+
+    granularity = request.GET.get('group', 'day')
+    if granularity not in GRANULARITY_CHOICES:
+        granularity = 'day'
+
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    return start, end, granularity
+
+
+def _buckets(start, end, granularity):
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current += timedelta(days=1)
+    return buckets
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _datetime_range(start, end):
+    tz = timezone.get_current_timezone()
+    return (datetime.combine(start, time.min, tzinfo=tz),
+            datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz))
+
+
+def grouped_series(queryset, date_field, values, start, end, granularity='day', is_datetime=True):
+    """
+    One GROUP BY query per chart: SUM each of `values` ({output_key: field}) per bucket.
+    Missing buckets are zero-filled so the chart always has a continuous x-axis.
+    """
+    if is_datetime:
+        lower, upper = _datetime_range(start, end)
+        queryset = queryset.filter(**{f'{date_field}__gte': lower, f'{date_field}__lt': upper})
+    else:
+        queryset = queryset.filter(**{f'{date_field}__range': (start, end)})
+
+    rows = (queryset
+            .annotate(bucket=Trunc(date_field, granularity, output_field=DateField()))
+            .values('bucket')
+            .annotate(**{key: Sum(field) for key, field in values.items()})
+            .order_by())
+    totals = {_as_date(row['bucket']): row for row in rows}
+
+    series = []
+    for bucket in _buckets(start, end, granularity):
+        row = totals.get(bucket, {})
+        point = {'date': bucket.strftime(LABEL_FORMATS[granularity])}
+        for key in values:
+            point[key] = float(row.get(key) or 0)
+        series.append(point)
+    return series
+
+
+def revenue_series(queryset, start, end, granularity='day'):
+    """Doanh thu đơn đã giao theo ngày/tuần/tháng"""
+    return grouped_series(queryset.filter(status='delivered'), 'created_at',
+                          {'revenue': 'total_amount'}, start, end, granularity)
+
+
+def stock_movement_series(start, end, granularity='day'):
+    """Nhập/xuất kho đọc từ bảng tổng hợp StockMovementDaily"""
+    return grouped_series(StockMovementDaily.objects.all(), 'day',
+                          {'stock_in': 'stock_in', 'stock_out': 'stock_out'},
+                          start, end, granularity, is_datetime=False)
+
+
+def status_counts(queryset):
+    """Số đơn theo từng trạng thái bằng một truy vấn GROUP BY status"""
+    counts = dict(queryset.values_list('status').annotate(count=Count('id')).order_by())
+    return [{'status': name, 'count': counts.get(code, 0)} for code, name in Order.STATUS_CHOICES]
+
+
+def order_kpis(queryset, **extra):
+    """Đếm nhiều chỉ số trên cùng một bảng Order bằng một câu aggregate với FILTER"""
+    return queryset.aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(status='pending')),
+        total_revenue=Sum('total_amount', filter=Q(status='delivered')),
+        **extra,
+    )
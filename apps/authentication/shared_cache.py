@@ -0,0 +1,44 @@
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def is_shared():
+    """
+    True when the default cache is visible to every worker process.
+
+    LocMemCache (Django's fallback when CACHES is not configured) lives inside one
+    process, so a version bump in one gunicorn worker would never reach the others.
+    Version-invalidated caches are bypassed on it instead of serving stale data.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+class CacheVersion:
+    """
+    Version token of a group of cache entries; keys built from it go stale together on bump().
+
+    The token is a random uuid rather than a counter, so it never repeats after the cache
+    is flushed, culled or restarted, and it can safely be used in an ETag.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def current(self):
+        version = cache.get(self.key)
+        if version is None:
+            cache.add(self.key, uuid.uuid4().hex, None)
+            # Whichever worker's add won is the version everyone uses
+            version = cache.get(self.key) or uuid.uuid4().hex
+        return version
+
+    def _bump(self):
+        cache.set(self.key, uuid.uuid4().hex, None)
+
+    def bump(self):
+        """Invalidate after commit, so a concurrent request cannot cache data from before the write"""
+        transaction.on_commit(self._bump)
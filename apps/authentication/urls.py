@@ -14,4 +14,5 @@ urlpatterns = [
     path('users/<int:pk>/activate/', views.user_activate, name='user_activate'),
 
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
 ]
\ No newline at end of file
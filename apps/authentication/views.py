@@ -1,12 +1,13 @@
 import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime
 from functools import wraps
 
 import numpy as np
-from django.db.models import Sum, F
+from django.db.models import Sum, F, Count, Q
 from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
@@ -15,8 +16,11 @@ from django.utils import timezone
 
 from apps.authentication.forms import UserProfileForm, CustomPasswordChangeForm, LoginForm
 from .models import User
+from .dashboard_cache import cached_block, cache_stats
+from .reports import (report_period, revenue_series, stock_movement_series, status_counts, order_kpis,
+                      RANGE_CHOICES, GRANULARITY_CHOICES)
 from inventorySystem import settings
-from ..ai_models.forecasting import ai_engine
+from ..ai_models.models import ProductForecast, TrainingJob
 from ..catalog.models import Product
 from ..inventory.models import StockIn, StockOut, Inventory
 from ..sales.models import Order, OrderItem
@@ -223,43 +227,92 @@ def user_activate(request, pk):
     return redirect('user_list')
 
 
+def _admin_blocks(start, end, granularity):
+    stats = order_kpis(Order.objects.all(), total_customers=Count('customer_phone', distinct=True))
+    stats['total_revenue'] = stats['total_revenue'] or 0
+    stats['total_products'] = Product.objects.filter(is_active=True).count()
+    stats['low_stock_items'] = Inventory.objects.filter(quantity__lte=F('min_quantity'), product__is_active=True).count()
+
+    return {
+        'stats': stats,
+        'revenue_by_day': json.dumps(revenue_series(Order.objects.all(), start, end, granularity)),
+        'order_status_data': json.dumps(status_counts(Order.objects.all())),
+    }
+
+
+def _warehouse_blocks(start, end, granularity):
+    today_start = timezone.make_aware(datetime.combine(end, datetime.min.time()))
+    inventory_stats = Inventory.objects.aggregate(
+        low_stock=Count('id', filter=Q(quantity__lte=F('min_quantity'))),
+        normal=Count('id', filter=Q(quantity__gt=F('min_quantity'), quantity__lt=F('max_quantity'))),
+        overstock=Count('id', filter=Q(quantity__gte=F('max_quantity'))),
+        total_inventory_value=Sum(F('quantity') * F('product__price')),
+    )
+    stats = {
+        'total_products': Product.objects.filter(is_active=True).count(),
+        'low_stock_items': inventory_stats['low_stock'],
+        'pending_orders': Order.objects.filter(status='pending').count(),
+        'stock_in_today': StockIn.objects.filter(created_at__gte=today_start).count(),
+        'stock_out_today': StockOut.objects.filter(created_at__gte=today_start).count(),
+        'total_inventory_value': inventory_stats['total_inventory_value'] or 0,
+    }
+
+    return {
+        'stats': stats,
+        'stock_movement': json.dumps(stock_movement_series(start, end, granularity)),
+        'inventory_status': {
+            'low_stock': inventory_stats['low_stock'],
+            'normal': inventory_stats['normal'],
+            'overstock': inventory_stats['overstock'],
+        },
+    }
+
+
+def _sales_blocks(user, start, end, granularity):
+    my_orders = Order.objects.filter(created_by=user)
+    month_start = end.replace(day=1)
+    sales_stats = my_orders.aggregate(
+        my_orders_today=Count('id', filter=Q(created_at__date=end)),
+        my_orders_month=Count('id', filter=Q(created_at__date__gte=month_start)),
+        my_revenue_month=Sum('total_amount', filter=Q(created_at__date__gte=month_start, status='delivered')),
+        my_pending_orders=Count('id', filter=Q(status='pending')),
+    )
+
+    my_top_products_list = list(OrderItem.objects.filter(
+        order__created_by=user,
+        order__status='delivered'
+    ).values('product__name').annotate(total_sold=Sum('quantity')).order_by('-total_sold')[:5])
+    for item in my_top_products_list:
+        item['total_sold'] = float(item['total_sold']) if item['total_sold'] else 0
+
+    return {
+        'stats': dict(sales_stats, my_revenue_month=sales_stats['my_revenue_month'] or 0),
+        'my_sales_by_day': json.dumps(revenue_series(my_orders, start, end, granularity)),
+        'my_order_status': json.dumps(status_counts(my_orders)),
+        'my_top_products': json.dumps(my_top_products_list),
+    }
+
+
+@login_required
+@user_role(['admin'])
+def dashboard_cache_stats(request):
+    return JsonResponse(cache_stats())
+
+
 @login_required
 def dashboard(request):
     user_role = request.user.role
-    today = datetime.now().date()
+    start, end, granularity = report_period(request)
+    report_context = {
+        'report_range': (end - start).days + 1,
+        'report_group': granularity,
+        'range_choices': RANGE_CHOICES,
+        'group_choices': GRANULARITY_CHOICES,
+    }
 
     if user_role == 'admin':
-        stats = {
-            'total_products': Product.objects.filter(is_active=True).count(),
-            'total_orders': Order.objects.count(),
-            'pending_orders': Order.objects.filter(status='pending').count(),
-            'low_stock_items': Inventory.objects.filter(quantity__lte=F('min_quantity'),product__is_active=True).count(),
-            'total_revenue': Order.objects.filter(status='delivered').aggregate(total=Sum('total_amount'))[
-                                 'total'] or 0,
-            'total_customers': Order.objects.values('customer_phone').distinct().count(),
-        }
-
-        last_7_days = today - timedelta(days=6)
-        revenue_by_day = []
-        for i in range(7):
-            date = last_7_days + timedelta(days=i)
-            revenue = Order.objects.filter(
-                status='delivered',
-                created_at__date=date
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-            revenue_by_day.append({
-                'date': date.strftime('%d/%m'),
-                'revenue': float(revenue)
-            })
-
-        order_status_data = []
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = Order.objects.filter(status=status_code).count()
-            order_status_data.append({
-                'status': status_name,
-                'count': count
-            })
+        blocks = cached_block('admin', 'blocks', lambda: _admin_blocks(start, end, granularity),
+                              params=(start, end, granularity))
 
         recent_orders = Order.objects.select_related('created_by').order_by('-created_at')[:5]
 
@@ -269,82 +322,64 @@ def dashboard(request):
         ).select_related('product')[:5]
 
         ai_forecast = []
-        ai_available = False
-
-        if ai_engine.load_model():
-            ai_available = True
 
-            # Get 5 products (Priority: Low stock -> High stock)
-            target_products = Inventory.objects.select_related('product').filter(product__is_active=True).order_by('quantity')[:5]
-
-            for inv in target_products:
-                # Direct prediction using Product ID string
-                product_forecast = ai_engine.predict_product_demand(str(inv.product.product_id))
+        # Get 5 products (Priority: Low stock -> High stock)
+        target_products = Inventory.objects.select_related('product').filter(product__is_active=True).order_by('quantity')[:5]
+        stored_forecasts = {
+            forecast.product_id: forecast
+            for forecast in ProductForecast.objects.filter(
+                product_id__in=[inv.product_id for inv in target_products], horizon=30
+            )
+        }
+        ai_available = bool(stored_forecasts)
+        ai_forecast_stale = any(forecast.is_stale for forecast in stored_forecasts.values())
+        ai_computed_at = min((forecast.computed_at for forecast in stored_forecasts.values()), default=None)
 
-                shortage = product_forecast - inv.quantity
+        for inv in target_products:
+            if inv.product_id not in stored_forecasts:
+                continue
+            product_forecast = stored_forecasts[inv.product_id].predicted_demand
 
-                if inv.quantity == 0:
-                    urgency = 'Critical'
-                elif shortage > 0:
-                    urgency = 'High'
-                else:
-                    urgency = 'Normal'
-                    shortage = 0
+            shortage = product_forecast - inv.quantity
 
-                ai_forecast.append({
-                    'product_name': inv.product.name,
-                    'current_stock': inv.quantity,
-                    'forecast': product_forecast,
-                    'shortage': shortage,
-                    'urgency': urgency
-                })
+            if inv.quantity == 0:
+                urgency = 'Critical'
+            elif shortage > 0:
+                urgency = 'High'
+            else:
+                urgency = 'Normal'
+                shortage = 0
+
+            ai_forecast.append({
+                'product_name': inv.product.name,
+                'current_stock': inv.quantity,
+                'forecast': product_forecast,
+                'shortage': shortage,
+                'urgency': urgency
+            })
 
-            # Sort critical items to top
-            urgency_order = {'Critical': 0, 'High': 1, 'Normal': 2}
-            ai_forecast.sort(key=lambda x: urgency_order.get(x['urgency'], 2))
+        # Sort critical items to top
+        urgency_order = {'Critical': 0, 'High': 1, 'Normal': 2}
+        ai_forecast.sort(key=lambda x: urgency_order.get(x['urgency'], 2))
 
         context = {
             'user_role': user_role,
-            'stats': stats,
-            'revenue_by_day': json.dumps(revenue_by_day),
-            'order_status_data': json.dumps(order_status_data),
+            **blocks,
             'recent_orders': recent_orders,
             'low_stock_products': low_stock_products,
             'ai_forecast': ai_forecast,
             'ai_available': ai_available,
+            'ai_forecast_stale': ai_forecast_stale,
+            'ai_computed_at': ai_computed_at,
+            'training_job': TrainingJob.objects.first(),
+            **report_context,
         }
         return render(request, 'dashboard/dashboard-admin.html', context)
 
 
     elif user_role == 'warehouse':
-        stats = {
-            'total_products': Product.objects.filter(is_active=True).count(),
-            'low_stock_items': Inventory.objects.filter(quantity__lte=F('min_quantity')).count(),
-            'pending_orders': Order.objects.filter(status='pending').count(),
-            'stock_in_today': StockIn.objects.filter(created_at__date=today).count(),
-            'stock_out_today': StockOut.objects.filter(created_at__date=today).count(),
-            'total_inventory_value': Inventory.objects.aggregate(total=Sum(F('quantity') * F('product__price')))[
-                                         'total'] or 0,
-        }
-
-        last_7_days = today - timedelta(days=6)
-        stock_movement = []
-        for i in range(7):
-            date = last_7_days + timedelta(days=i)
-            stock_in = StockIn.objects.filter(created_at__date=date).aggregate(total=Sum('quantity'))['total'] or 0
-            stock_out = StockOut.objects.filter(created_at__date=date).aggregate(total=Sum('quantity'))['total'] or 0
-
-            stock_movement.append({
-                'date': date.strftime('%d/%m'),
-                'stock_in': float(stock_in),
-                'stock_out': float(stock_out)
-            })
-
-        inventory_status = {
-            'low_stock': Inventory.objects.filter(quantity__lte=F('min_quantity')).count(),
-            'normal': Inventory.objects.filter(quantity__gt=F('min_quantity'), quantity__lt=F('max_quantity')).count(),
-            'overstock': Inventory.objects.filter(quantity__gte=F('max_quantity')).count(),
-        }
+        blocks = cached_block('warehouse', 'blocks', lambda: _warehouse_blocks(start, end, granularity),
+                              params=(start, end, granularity))
 
         pending_orders = Order.objects.filter(status='pending').select_related('created_by')[:10]
 
@@ -357,74 +392,31 @@ def dashboard(request):
 
         context = {
             'user_role': user_role,
-            'stats': stats,
-            'stock_movement': json.dumps(stock_movement),
-            'inventory_status': inventory_status,
+            **blocks,
             'pending_orders': pending_orders,
             'low_stock_products': low_stock_products,
             'recent_stock_in': recent_stock_in,
             'recent_stock_out': recent_stock_out,
+            **report_context,
         }
         return render(request, 'dashboard/dashboard-warehouse.html', context)
 
     elif user_role == 'sales':
-        stats = {
-            'my_orders_today': Order.objects.filter(created_by=request.user, created_at__date=today).count(),
-            'my_orders_month': Order.objects.filter(created_by=request.user, created_at__month=today.month,
-                                                    created_at__year=today.year).count(),
-            'my_revenue_month': Order.objects.filter(created_by=request.user, created_at__month=today.month,
-                                                     created_at__year=today.year, status='delivered').aggregate(
-                total=Sum('total_amount'))['total'] or 0,
-            'my_pending_orders': Order.objects.filter(created_by=request.user, status='pending').count(),
-        }
-
-        last_7_days = today - timedelta(days=6)
-        my_sales_by_day = []
-        for i in range(7):
-            date = last_7_days + timedelta(days=i)
-            revenue = Order.objects.filter(
-                created_by=request.user,
-                status='delivered',
-                created_at__date=date
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-
-            my_sales_by_day.append({
-                'date': date.strftime('%d/%m'),
-                'revenue': float(revenue)
-            })
-
-        my_order_status = []
-        for status_code, status_name in Order.STATUS_CHOICES:
-            count = Order.objects.filter(created_by=request.user, status=status_code).count()
-            my_order_status.append({
-                'status': status_name,
-                'count': count
-            })
+        blocks = cached_block('sales', 'blocks', lambda: _sales_blocks(request.user, start, end, granularity),
+                              user_id=request.user.id, params=(start, end, granularity))
 
         my_recent_orders = Order.objects.filter(created_by=request.user).order_by('-created_at')[:10]
 
-        my_top_products_qs = OrderItem.objects.filter(
-            order__created_by=request.user,
-            order__status='delivered'
-        ).values('product__name').annotate(total_sold=Sum('quantity')).order_by('-total_sold')[:5]
-
-
-        my_top_products_list = list(my_top_products_qs)
-        for item in my_top_products_list:
-            item['total_sold'] = float(item['total_sold']) if item['total_sold'] else 0
-
         low_stock_products = Inventory.objects.filter(
             quantity__lte=F('min_quantity')
         ).select_related('product')[:5]
 
         context = {
             'user_role': user_role,
-            'stats': stats,
-            'my_sales_by_day': json.dumps(my_sales_by_day),
-            'my_order_status': json.dumps(my_order_status),
+            **blocks,
             'my_recent_orders': my_recent_orders,
-            'my_top_products': json.dumps(my_top_products_list),
             'low_stock_products': low_stock_products,
+            **report_context,
         }
         return render(request, 'dashboard/dashboard-sales.html', context)
 
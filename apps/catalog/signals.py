@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product
+from .snapshot import bump_version
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog_snapshot(sender, **kwargs):
+    bump_version()
@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product
+from ..authentication.shared_cache import CacheVersion, is_shared
+
+VERSION_KEY = 'catalog:snapshot:version'
+FIELDS = ['id', 'name', 'code', 'price', 'unit', 'stock']
+
+
+def _timeout():
+    return getattr(settings, 'CATALOG_SNAPSHOT_TIMEOUT', 86400)
+
+
+_version = CacheVersion(VERSION_KEY)
+
+
+def bump_version():
+    """Invalidate the cached snapshot once the Product/Inventory write has committed"""
+    _version.bump()
+
+
+def build_snapshot():
+    """
+    Active products as compact JSON: {"fields": [...], "rows": [[...], ...]}.
+    One query; stock is what new orders can still reserve, 0 without an Inventory row.
+    """
+    rows = (Product.objects.filter(is_active=True)
+            .order_by('name', 'id')
+            .values_list('id', 'name', 'product_id', 'price', 'unit', 'inventory__available'))
+    data = {
+        'fields': FIELDS,
+        'rows': [[pk, name, code, float(price), unit, stock or 0] for pk, name, code, price, unit, stock in rows],
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def snapshot_etag(body):
+    """Derived from the content, so equal snapshots match whichever worker built them"""
+    return f'"catalog-{hashlib.sha256(body.encode()).hexdigest()[:32]}"'
+
+
+def get_snapshot():
+    """Return (etag, json) for the current catalog, building it at most once per version"""
+    if not is_shared():
+        # A version bump in this worker would not reach the others' copies
+        body = build_snapshot()
+        return snapshot_etag(body), body
+
+    key = f'catalog:snapshot:{_version.current()}'
+    cached = cache.get(key)
+    if cached is None:
+        body = build_snapshot()
+        cached = (snapshot_etag(body), body)
+        cache.set(key, cached, _timeout())
+    return cached
@@ -9,6 +9,7 @@ urlpatterns = [
     path('product/<int:id>/', views.product_detail, name='product_detail'),
     path('product/<int:id>/edit', views.edit_product, name='edit_product'),
     path('product/<int:id>/delete', views.delete_product, name='delete_product'),
+    path('product/snapshot.json', views.product_snapshot, name='product_snapshot'),
 
     # URLS CATEGORY MODULE
     path('category/add/', views.add_category, name='add_category'),
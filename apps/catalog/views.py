@@ -2,12 +2,15 @@ from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.http import HttpResponse
+from django.views.decorators.http import etag
 from apps.inventory.models import Inventory, StockIn
 from .models import Product, Category, Supplier
 from .forms import ProductForm, CategoryForm, SupplierForm
 
 from ..authentication.views import user_role
 from ..sales.models import OrderItem
+from .snapshot import get_snapshot
 
 # ========== PRODUCT ========== #
 @login_required
@@ -93,6 +96,23 @@ def delete_product(request, id):
     messages.success(request, "Product has been permanently deleted.")
     return redirect('product_list')
 
+def _request_snapshot(request):
+    # Read once per request: the etag check and the view both need it
+    if not hasattr(request, '_catalog_snapshot'):
+        request._catalog_snapshot = get_snapshot()
+    return request._catalog_snapshot
+
+@login_required
+@user_role(['admin', 'sales'])
+@etag(lambda request: _request_snapshot(request)[0])
+def product_snapshot(request):
+    """Active products with price and stock for the order form; 304 while the catalog is unchanged"""
+    _, body = _request_snapshot(request)
+    response = HttpResponse(body, content_type='application/json')
+    # Let the browser keep it, but revalidate on every form open
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 # ================================================== #
 
 # ========== Category ========== #
@@ -1,14 +1,14 @@
 
 from django.contrib import admin
-from .models import Inventory, StockIn, StockOut
+from .models import Inventory, StockIn, StockOut, StockReservation
 
 
 @admin.register(Inventory)
 class InventoryAdmin(admin.ModelAdmin):
-    list_display = ('product__product_id','product', 'quantity', 'min_quantity', 'max_quantity', 'is_low_stock', 'last_updated')
+    list_display = ('product__product_id','product', 'quantity', 'reserved', 'available', 'min_quantity', 'max_quantity', 'is_low_stock', 'last_updated')
     list_filter = ('last_updated', 'min_quantity')
     search_fields = ('product__name', 'product__code')
-    readonly_fields = ('quantity', 'last_updated')  # Không cho phép sửa quantity trực tiếp
+    readonly_fields = ('quantity', 'reserved', 'available', 'last_updated')  # Không cho phép sửa quantity trực tiếp
     # Dùng list_select_related để tối ưu truy vấn ForeignKey
     list_select_related = ('product',)
 
@@ -34,4 +34,11 @@ class StockOutAdmin(admin.ModelAdmin):
     list_display = ('product', 'quantity', 'order', 'created_by', 'created_at')
     search_fields = ('product__name', 'order__order_code')
     list_filter = ('created_at',)
-    list_select_related = ('product', 'order', 'created_by')
\ No newline at end of file
+    list_select_related = ('product', 'order', 'created_by')
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'order', 'quantity', 'created_at', 'expires_at')
+    search_fields = ('product__name', 'order__order_id')
+    list_filter = ('expires_at',)
+    list_select_related = ('product', 'order')
@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction, OperationalError
+
+from apps.catalog.models import Category, Product
+from apps.inventory.models import Inventory
+from apps.inventory.services import decrement_stock, InsufficientStock
+
+
+def locked_decrement(product_id, quantity):
+    """Old StockOut.save path: SELECT ... FOR UPDATE, check in Python, then save"""
+    with transaction.atomic():
+        inventory = Inventory.objects.select_for_update().get(product_id=product_id)
+        if inventory.quantity < quantity:
+            raise InsufficientStock(product_id, quantity, inventory.quantity)
+        inventory.quantity -= quantity
+        inventory.save()
+        return inventory.quantity
+
+
+def conditional_decrement(product_id, quantity):
+    with transaction.atomic():
+        return decrement_stock(product_id, quantity)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent stock deductions on a single product (N threads hammering one row)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=200, help='Deductions per thread')
+        parser.add_argument('--mode', choices=['conditional', 'locked', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        modes = ['locked', 'conditional'] if options['mode'] == 'both' else [options['mode']]
+        threads = options['threads']
+        iterations = options['iterations']
+        total = threads * iterations
+
+        suffix = uuid.uuid4().hex[:8].upper()
+        category = Category.objects.create(category_id=f'BENCH-{suffix}', name='Benchmark')
+        product = Product.objects.create(
+            product_id=f'BENCH-{suffix}', name='Benchmark product', category=category, unit='pcs', price=1,
+        )
+        # Stock for only ~90% of the attempts so the insufficient-stock branch is exercised too
+        initial_stock = int(total * 0.9)
+
+        try:
+            for mode in modes:
+                Inventory.objects.update_or_create(product=product, defaults={'quantity': initial_stock})
+                func = locked_decrement if mode == 'locked' else conditional_decrement
+                self._run(mode, func, product.id, threads, iterations, initial_stock)
+        finally:
+            Inventory.objects.filter(product=product).delete()
+            product.delete()
+            category.delete()
+
+    def _run(self, mode, func, product_id, threads, iterations, initial_stock):
+        counters = {'ok': 0, 'rejected': 0, 'errors': 0}
+        latencies = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            local_latencies = []
+            local = {'ok': 0, 'rejected': 0, 'errors': 0}
+            barrier.wait()
+            try:
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    try:
+                        func(product_id, 1)
+                        local['ok'] += 1
+                    except InsufficientStock:
+                        local['rejected'] += 1
+                    except OperationalError:
+                        local['errors'] += 1
+                    local_latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                for key, value in local.items():
+                    counters[key] += value
+                latencies.extend(local_latencies)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        final_qty = Inventory.objects.get(product_id=product_id).quantity
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+        consistent = final_qty == initial_stock - counters['ok'] and final_qty >= 0
+
+        self.stdout.write(
+            f"[{mode}] threads={threads} ops={threads * iterations} time={elapsed:.2f}s "
+            f"throughput={threads * iterations / elapsed:.0f} ops/s p50={p50:.2f}ms p99={p99:.2f}ms "
+            f"ok={counters['ok']} rejected={counters['rejected']} errors={counters['errors']} "
+            f"final_qty={final_qty}"
+        )
+        if consistent:
+            self.stdout.write(self.style.SUCCESS(f'[{mode}] Stock is consistent (no oversell, no lost update)'))
+        else:
+            self.stdout.write(self.style.ERROR(f'[{mode}] Stock mismatch! Expected {initial_stock - counters["ok"]}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from apps.inventory.services import expire_reservations
+
+
+class Command(BaseCommand):
+    help = 'Release stock reservations of pending orders that have expired (run from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        expired = expire_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {expired} expired reservations'))
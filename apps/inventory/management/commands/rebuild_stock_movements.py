@@ -0,0 +1,73 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.inventory.models import StockIn, StockOut, StockMovementDaily
+
+
+class Command(BaseCommand):
+    help = 'Backfill and reconcile the daily per-product stock movement rollup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only reconcile the last N days (default: full history)')
+        parser.add_argument('--dry-run', action='store_true', help='Report differences without writing')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+
+        # Nguồn dữ liệu chuẩn: phiếu nhập đã duyệt và phiếu xuất còn hiệu lực
+        expected = defaultdict(lambda: [0, 0])
+        sources = [
+            (StockIn.objects.filter(approved_by__isnull=False, is_disable=False), 0),
+            (StockOut.objects.filter(is_disable=False), 1),
+        ]
+        for queryset, column in sources:
+            rows = (queryset.annotate(day=TruncDate('created_at'))
+                    .values('product_id', 'day')
+                    .annotate(total=Sum('quantity'))
+                    .order_by())
+            if since:
+                rows = rows.filter(day__gte=since)
+            for row in rows:
+                expected[(row['product_id'], row['day'])][column] = row['total'] or 0
+
+        current = StockMovementDaily.objects.all()
+        if since:
+            current = current.filter(day__gte=since)
+        current = {(row.product_id, row.day): row for row in current}
+
+        to_create, to_update, to_delete = [], [], []
+        for key, (stock_in, stock_out) in expected.items():
+            row = current.get(key)
+            if row is None:
+                if stock_in or stock_out:
+                    to_create.append(StockMovementDaily(product_id=key[0], day=key[1],
+                                                        stock_in=stock_in, stock_out=stock_out))
+            elif (row.stock_in, row.stock_out) != (stock_in, stock_out):
+                row.stock_in, row.stock_out = stock_in, stock_out
+                to_update.append(row)
+        for key, row in current.items():
+            if key not in expected:
+                to_delete.append(row.id)
+
+        self.stdout.write(
+            f'Missing: {len(to_create)}, mismatched: {len(to_update)}, orphaned: {len(to_delete)} '
+            f'(checked {len(expected)} product-days)'
+        )
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            StockMovementDaily.objects.bulk_create(to_create, batch_size=1000)
+            StockMovementDaily.objects.bulk_update(to_update, ['stock_in', 'stock_out'], batch_size=1000)
+            StockMovementDaily.objects.filter(id__in=to_delete).delete()
+
+        self.stdout.write(self.style.SUCCESS('Stock movement rollup is up to date!'))
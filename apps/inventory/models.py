@@ -10,6 +10,13 @@ from inventorySystem.settings import AUTH_USER_MODEL
 class Inventory(models.Model):
     product = models.OneToOneField(Product, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=0)
+    # Units held by pending orders (StockReservation), maintained by inventory.services
+    reserved = models.IntegerField(default=0, editable=False)
+    available = models.GeneratedField(
+        expression=models.F('quantity') - models.F('reserved'),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     min_quantity = models.IntegerField(default=10)
     max_quantity = models.IntegerField(default=1000)
     last_updated = models.DateTimeField(auto_now=True)
@@ -39,6 +46,11 @@ class StockIn(models.Model):
     update_at = models.DateTimeField(auto_now=True)
     is_disable = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='stockin_created_id_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_cost = self.quantity * self.unit_price
         super().save(*args, **kwargs)
@@ -73,6 +85,9 @@ class StockOut(models.Model):
     is_disable = models.BooleanField(default=False)
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='stockout_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Out {self.quantity} {self.product.unit} - {self.get_type_display()}"
@@ -81,13 +96,50 @@ class StockOut(models.Model):
         is_new = self.pk is None
 
         if is_new:
+            from .services import decrement_stock, record_stock_out
+
             with transaction.atomic():
-                inventory = Inventory.objects.select_for_update().get(product=self.product)
-                if inventory.quantity < self.quantity:
-                    raise ValueError(f"Insufficient stock! Current stock: {inventory.quantity}")
+                self.updated_quantity = decrement_stock(self.product_id, self.quantity)
+                super().save(*args, **kwargs)
+                record_stock_out(self)
+            return
+        super().save(*args, **kwargs)
 
-                inventory.quantity -= self.quantity
-                inventory.save()
 
-                self.updated_quantity = inventory.quantity
-        super().save(*args, **kwargs)
+class StockMovementDaily(models.Model):
+    """Tổng nhập/xuất theo (sản phẩm, ngày) - được cập nhật dần khi có phiếu nhập/xuất"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_movements')
+    day = models.DateField()
+    stock_in = models.IntegerField(default=0)
+    stock_out = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_day_movement'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='movement_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id} {self.day}: +{self.stock_in} / -{self.stock_out}'
+
+
+class StockReservation(models.Model):
+    """Units promised to a pending order; released on confirmation, cancellation or expiry"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_order_product_reservation'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.order_id} holds {self.quantity} x {self.product_id} until {self.expires_at}'
@@ -0,0 +1,74 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(obj):
+    """Cursor = vị trí (created_at, id) của một bản ghi, mã hóa base64 cho URL"""
+    raw = json.dumps([obj.created_at.isoformat(), obj.pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        created_at, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        created_at = parse_datetime(created_at)
+        if created_at is None:
+            return None
+        return created_at, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_paginate(queryset, cursor=None, direction='next', page_size=PAGE_SIZE):
+    """
+    Keyset pagination on (created_at DESC, id DESC).
+
+    Instead of OFFSET, each page continues from the last row the client saw, so the
+    database only reads `page_size + 1` index entries no matter how deep the page is.
+    """
+    try:
+        page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        page_size = PAGE_SIZE
+    position = decode_cursor(cursor)
+    backwards = position is not None and direction == 'prev'
+
+    if position is not None:
+        created_at, pk = position
+        if backwards:
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+        else:
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    if backwards:
+        queryset = queryset.order_by('created_at', 'id')
+    else:
+        queryset = queryset.order_by('-created_at', '-id')
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if backwards:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, position is not None
+
+    return {
+        'object_list': rows,
+        'has_next': has_next and bool(rows),
+        'has_prev': has_prev and bool(rows),
+        'next_cursor': encode_cursor(rows[-1]) if rows else None,
+        'prev_cursor': encode_cursor(rows[0]) if rows else None,
+        'page_size': page_size,
+    }
@@ -0,0 +1,270 @@
+from django.db import connection, transaction, IntegrityError
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, When, F, Q
+from django.utils import timezone
+
+from .models import Inventory, StockMovementDaily, StockReservation
+from ..authentication.dashboard_cache import bump_version
+from ..catalog.snapshot import bump_version as bump_catalog_version
+
+
+class InsufficientStock(ValueError):
+    """Raised when a conditional decrement finds less stock than requested"""
+
+    def __init__(self, product_id, requested, available):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock! Current stock: {available}")
+
+
+class StockReservationError(ValueError):
+    """Raised when some products of an order cannot be reserved; `shortages` is {product_id: available}"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f"Insufficient stock! {len(shortages)} product(s) cannot be reserved")
+
+
+def _inventory_sql(template):
+    qn = connection.ops.quote_name
+    return template.format(
+        table=qn(Inventory._meta.db_table),
+        quantity=qn('quantity'),
+        available=qn('available'),
+        last_updated=qn('last_updated'),
+        product_id=qn('product_id'),
+    )
+
+
+def _now():
+    return connection.ops.adapt_datetimefield_value(timezone.now())
+
+
+def decrement_stock(product_id, quantity):
+    """
+    Deduct stock with a single statement:
+    UPDATE ... SET quantity = quantity - n WHERE available >= n RETURNING quantity
+
+    The check and the write are one statement, so there is no read-then-write window and
+    no separate SELECT ... FOR UPDATE round trip. The row lock the UPDATE takes is still
+    held until the surrounding transaction commits (every caller runs inside atomic()),
+    so keep that transaction short.
+    Units reserved for pending orders cannot be taken.
+    Returns the new quantity or raises InsufficientStock.
+    """
+    sql = _inventory_sql(
+        'UPDATE {table} SET {quantity} = {quantity} - %s, {last_updated} = %s '
+        'WHERE {product_id} = %s AND {available} >= %s RETURNING {quantity}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [quantity, _now(), product_id, quantity])
+        row = cursor.fetchone()
+
+    if row is None:
+        available = Inventory.objects.filter(product_id=product_id).values_list('available', flat=True).first()
+        raise InsufficientStock(product_id, quantity, available or 0)
+    bump_version()
+    bump_catalog_version()
+    return row[0]
+
+
+def increment_stock(product_id, quantity):
+    """Cộng lại tồn kho (nhập kho, hủy phiếu xuất, hủy đơn). Tạo bản ghi Inventory nếu chưa có."""
+    sql = _inventory_sql(
+        'UPDATE {table} SET {quantity} = {quantity} + %s, {last_updated} = %s '
+        'WHERE {product_id} = %s RETURNING {quantity}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [quantity, _now(), product_id])
+        row = cursor.fetchone()
+    if row is not None:
+        bump_version()
+        bump_catalog_version()
+        return row[0]
+
+    try:
+        with transaction.atomic():
+            return Inventory.objects.create(product_id=product_id, quantity=quantity).quantity
+    except IntegrityError:
+        # Another transaction created the row first, apply the increment to it
+        return increment_stock(product_id, quantity)
+
+
+def lock_inventory(product_ids):
+    """
+    Lock the Inventory rows of several products at once and return {product_id: (quantity, reserved)}.
+    Rows are always locked in product_id order so two batches touching overlapping
+    products can never deadlock each other.
+    """
+    rows = (Inventory.objects.select_for_update()
+            .filter(product_id__in=set(product_ids))
+            .order_by('product_id')
+            .values_list('product_id', 'quantity', 'reserved'))
+    return {product_id: (quantity, reserved) for product_id, quantity, reserved in rows}
+
+
+def _add_case(field, deltas):
+    whens = [When(product_id=product_id, then=F(field) + delta) for product_id, delta in deltas.items()]
+    return Case(*whens, default=F(field))
+
+
+def apply_stock_deltas(deltas, reserved=None):
+    """
+    Apply {product_id: delta} to Inventory with one UPDATE ... SET quantity = CASE ... END.
+    `reserved` ({product_id: delta}) adjusts the reserved units in the same statement.
+    The rows are locked in product_id order first: the UPDATE itself locks them in scan
+    order, which could deadlock against another batch touching the same products.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    reserved = {product_id: delta for product_id, delta in (reserved or {}).items() if delta}
+    if not deltas and not reserved:
+        return 0
+    lock_inventory(deltas.keys() | reserved.keys())
+    bump_catalog_version()
+
+    updates = {}
+    if deltas:
+        bump_version()
+        updates['quantity'] = _add_case('quantity', deltas)
+        updates['last_updated'] = timezone.now()
+    if reserved:
+        updates['reserved'] = _add_case('reserved', reserved)
+    return Inventory.objects.filter(product_id__in=deltas.keys() | reserved.keys()).update(**updates)
+
+
+def reservation_expiry():
+    return timezone.now() + timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 1440))
+
+
+def reserve_stock(order, quantities, expires_at=None):
+    """
+    Hold {product_id: quantity} for a pending order.
+
+    The Inventory rows are locked in product_id order (lock_inventory), checked in memory,
+    then every product is reserved with one UPDATE ... SET reserved = reserved + CASE ... END.
+    All products are reserved or none: any shortage raises StockReservationError with
+    what is available, before anything is written.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return []
+
+    with transaction.atomic():
+        locked = lock_inventory(quantities)
+        available = {product_id: quantity - reserved for product_id, (quantity, reserved) in locked.items()}
+        shortages = {
+            product_id: available.get(product_id, 0)
+            for product_id, quantity in quantities.items()
+            if available.get(product_id, 0) < quantity
+        }
+        if shortages:
+            raise StockReservationError(shortages)
+
+        Inventory.objects.filter(product_id__in=quantities.keys()).update(reserved=_add_case('reserved', quantities))
+        expires_at = expires_at or reservation_expiry()
+        reservations = StockReservation.objects.bulk_create([
+            StockReservation(product_id=product_id, order=order, quantity=quantity, expires_at=expires_at)
+            for product_id, quantity in quantities.items()
+        ])
+
+    bump_catalog_version()
+    return reservations
+
+
+def _release(reservations):
+    """Delete locked (id, product_id, quantity) reservation rows and give their units back"""
+    if not reservations:
+        return 0
+    totals = defaultdict(int)
+    for _, product_id, quantity in reservations:
+        totals[product_id] -= quantity
+    StockReservation.objects.filter(id__in=[pk for pk, _, _ in reservations]).delete()
+    apply_stock_deltas({}, reserved=totals)
+    return len(reservations)
+
+
+def release_reservations(order_ids):
+    """Release everything held by the given orders (cancelled, edited or deleted)"""
+    with transaction.atomic():
+        rows = list(StockReservation.objects.select_for_update()
+                    .filter(order_id__in=order_ids)
+                    .values_list('id', 'product_id', 'quantity'))
+        return _release(rows)
+
+
+def expire_reservations(now=None, batch_size=1000):
+    """
+    Release reservations past their expiry, batch_size rows per transaction.
+    Each batch is one SELECT, one DELETE and one UPDATE however many products it covers;
+    rows locked by a confirmation in progress are skipped and left to that transaction.
+    """
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        with transaction.atomic():
+            rows = list(StockReservation.objects.select_for_update(skip_locked=True)
+                        .filter(expires_at__lte=now)
+                        .order_by('expires_at')
+                        .values_list('id', 'product_id', 'quantity')[:batch_size])
+            expired += _release(rows)
+        if len(rows) < batch_size:
+            return expired
+
+
+def movement_day(created_at):
+    return timezone.localdate(created_at) if created_at else timezone.localdate()
+
+
+def record_movements(movements):
+    """
+    Add (product_id, created_at, stock_in_delta, stock_out_delta) entries to the daily rollup.
+
+    Entries are merged per (product, day); missing rows are inserted with one
+    bulk_create(ignore_conflicts=True) and the totals are bumped with one UPDATE,
+    so a batch costs two queries however many products it touches.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for product_id, created_at, stock_in, stock_out in movements:
+        key = (product_id, movement_day(created_at))
+        totals[key][0] += stock_in
+        totals[key][1] += stock_out
+    totals = {key: value for key, value in totals.items() if value[0] or value[1]}
+    if not totals:
+        return
+
+    bump_version()
+    StockMovementDaily.objects.bulk_create(
+        [StockMovementDaily(product_id=product_id, day=day) for product_id, day in totals],
+        ignore_conflicts=True,
+    )
+
+    in_whens, out_whens = [], []
+    for (product_id, day), (stock_in, stock_out) in totals.items():
+        if stock_in:
+            in_whens.append(When(product_id=product_id, day=day, then=F('stock_in') + stock_in))
+        if stock_out:
+            out_whens.append(When(product_id=product_id, day=day, then=F('stock_out') + stock_out))
+
+    updates = {}
+    if in_whens:
+        updates['stock_in'] = Case(*in_whens, default=F('stock_in'))
+    if out_whens:
+        updates['stock_out'] = Case(*out_whens, default=F('stock_out'))
+
+    keys = reduce(or_, (Q(product_id=product_id, day=day) for product_id, day in totals))
+    StockMovementDaily.objects.filter(keys).update(**updates)
+
+
+def record_stock_in(stock_in, sign=1):
+    record_movements([(stock_in.product_id, stock_in.created_at, sign * stock_in.quantity, 0)])
+
+
+def record_stock_out(stock_out, sign=1):
+    record_movements([(stock_out.product_id, stock_out.created_at, 0, sign * stock_out.quantity)])
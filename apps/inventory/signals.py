@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Inventory, StockIn, StockOut
+from ..authentication.dashboard_cache import bump_version
+from ..catalog.snapshot import bump_version as bump_catalog_version
+
+
+@receiver([post_save, post_delete], sender=Inventory)
+@receiver([post_save, post_delete], sender=StockIn)
+@receiver([post_save, post_delete], sender=StockOut)
+def invalidate_dashboard_cache(sender, **kwargs):
+    bump_version()
+
+
+@receiver([post_save, post_delete], sender=Inventory)
+def invalidate_catalog_snapshot(sender, **kwargs):
+    bump_catalog_version()
@@ -1,3 +1,107 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from apps.catalog.models import Category, Product
+from apps.sales.models import Order
+
+from .models import Inventory, StockReservation
+from .pagination import keyset_paginate
+from .services import StockReservationError, expire_reservations, release_reservations, reserve_stock
+
+
+def make_order(order_id):
+    return Order.objects.create(order_id=order_id, customer_name='Khach', customer_email='k@example.com',
+                                customer_phone='0900000000', customer_address='HN')
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(category_id='C1', name='Category')
+        self.products = [
+            Product.objects.create(product_id=f'P{i}', name=f'Product {i}', category=category, unit='pc',
+                                   price=Decimal('1.00'))
+            for i in range(3)
+        ]
+        for product in self.products:
+            Inventory.objects.create(product=product, quantity=10)
+        self.order = make_order('DH001')
+
+    def reserved(self):
+        return dict(Inventory.objects.values_list('product_id', 'reserved'))
+
+    def test_reserve_holds_every_product(self):
+        a, b, _ = self.products
+
+        reservations = reserve_stock(self.order, {a.id: 4, b.id: 10})
+
+        self.assertEqual(len(reservations), 2)
+        self.assertEqual(self.reserved(), {a.id: 4, b.id: 10, self.products[2].id: 0})
+        self.assertEqual(Inventory.objects.get(product=b).available, 0)
+
+    def test_reserve_is_all_or_nothing(self):
+        a, b, c = self.products
+        reserve_stock(make_order('DH002'), {b.id: 8})
+
+        with self.assertRaises(StockReservationError) as raised:
+            reserve_stock(self.order, {a.id: 4, b.id: 3, c.id: 11})
+
+        self.assertEqual(raised.exception.shortages, {b.id: 2, c.id: 10})
+        self.assertEqual(self.reserved(), {a.id: 0, b.id: 8, c.id: 0})
+        self.assertFalse(StockReservation.objects.filter(order=self.order).exists())
+
+    def test_release_gives_units_back(self):
+        a, b, _ = self.products
+        reserve_stock(self.order, {a.id: 4, b.id: 2})
+
+        self.assertEqual(release_reservations([self.order.id]), 2)
+
+        self.assertEqual(set(self.reserved().values()), {0})
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expire_releases_only_expired_reservations(self):
+        a, b, _ = self.products
+        now = timezone.now()
+        reserve_stock(self.order, {a.id: 4}, expires_at=now - timedelta(minutes=1))
+        reserve_stock(make_order('DH002'), {a.id: 1, b.id: 2}, expires_at=now + timedelta(hours=1))
+
+        self.assertEqual(expire_reservations(now=now, batch_size=1), 1)
+
+        self.assertEqual(self.reserved()[a.id], 1)
+        self.assertEqual(self.reserved()[b.id], 2)
+        self.assertFalse(StockReservation.objects.filter(order=self.order).exists())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        for i in range(7):
+            order = make_order(f'DH{i:03}')
+            # Two orders share each timestamp so the id tie-breaker is exercised
+            Order.objects.filter(pk=order.pk).update(created_at=start + timedelta(hours=i // 2))
+        self.newest_first = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def ids(self, page):
+        return [order.id for order in page['object_list']]
+
+    def test_pages_forward_and_back_without_gaps(self):
+        queryset = Order.objects.all()
+        first = keyset_paginate(queryset, page_size=3)
+        second = keyset_paginate(queryset, first['next_cursor'], page_size=3)
+        third = keyset_paginate(queryset, second['next_cursor'], page_size=3)
+
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.newest_first)
+        self.assertEqual((first['has_prev'], first['has_next']), (False, True))
+        self.assertEqual((third['has_prev'], third['has_next']), (True, False))
+
+        back = keyset_paginate(queryset, second['prev_cursor'], direction='prev', page_size=3)
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back['has_prev'])
+
+    def test_invalid_cursor_and_page_size_fall_back_to_first_page(self):
+        page = keyset_paginate(Order.objects.all(), cursor='not-a-cursor', page_size='abc')
 
-# Create your tests here.
+        self.assertEqual(self.ids(page), self.newest_first)
+        self.assertEqual(page['page_size'], 50)
@@ -1,3 +1,5 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from apps.sales.models import Order
 from django.shortcuts import render, redirect, get_object_or_404
@@ -5,10 +7,16 @@ from django.contrib import messages
 from apps.catalog.models import Product, Supplier
 from .forms import StockInForm, StockOutForm
 from django.db import transaction, models
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import Inventory, StockIn, StockOut
-from datetime import datetime
+from .pagination import keyset_paginate, PAGE_SIZE
+from .services import decrement_stock, increment_stock, InsufficientStock, record_stock_in, record_stock_out
+from datetime import datetime, time, timedelta
 from ..authentication.views import user_role
 
+MOVEMENT_FILTERS = ('product', 'supplier', 'type', 'date_from', 'date_to', 'is_disable')
+
 
 @login_required
 def dashboard(request):
@@ -55,17 +63,60 @@ def add_stock_in(request):
     return render(request, 'inventory/stock-in-form.html', {'form': form})
 
 
+def _filter_movements(queryset, params):
+    """Lọc phiếu nhập/xuất theo các tham số GET (product, supplier, type, date range, is_disable)"""
+    filters = {key: params.get(key, '').strip() for key in MOVEMENT_FILTERS}
+
+    if filters['product'].isdigit():
+        queryset = queryset.filter(product_id=int(filters['product']))
+    if filters['supplier'].isdigit() and hasattr(queryset.model, 'supplier'):
+        queryset = queryset.filter(supplier_id=int(filters['supplier']))
+    if filters['type'] and hasattr(queryset.model, 'TYPE_CHOICES'):
+        queryset = queryset.filter(type=filters['type'])
+
+    # Dùng khoảng datetime thay cho __date để vẫn tận dụng được index trên created_at
+    tz = timezone.get_current_timezone()
+    date_from = parse_date(filters['date_from']) if filters['date_from'] else None
+    date_to = parse_date(filters['date_to']) if filters['date_to'] else None
+    if date_from:
+        queryset = queryset.filter(created_at__gte=datetime.combine(date_from, time.min, tzinfo=tz))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=datetime.combine(date_to + timedelta(days=1), time.min, tzinfo=tz))
+
+    if filters['is_disable'] in ('0', '1'):
+        queryset = queryset.filter(is_disable=filters['is_disable'] == '1')
+
+    return queryset, {key: value for key, value in filters.items() if value}
+
+
+def _movement_page_context(request, queryset):
+    queryset, active_filters = _filter_movements(queryset, request.GET)
+    page = keyset_paginate(
+        queryset,
+        cursor=request.GET.get('cursor'),
+        direction=request.GET.get('dir', 'next'),
+        page_size=request.GET.get('page_size') or PAGE_SIZE,
+    )
+    return {
+        'page': page,
+        'filters': active_filters,
+        'filter_query': urlencode(active_filters),
+        'products': Product.objects.filter(is_active=True).only('id', 'name').order_by('name'),
+    }
+
+
 @login_required
 @user_role(['admin', 'warehouse'])
 def stock_in_list(request):
     stock_ins = StockIn.objects.select_related(
-        'product', 'supplier', 'created_by'
-    ).order_by('-created_at')
-    suppliers = Supplier.objects.all()
-    return render(request, 'inventory/stock-in-list.html', {
-        'stock_ins': stock_ins,
-        'suppliers': suppliers,
+        'product', 'supplier', 'created_by', 'approved_by'
+    )
+    context = _movement_page_context(request, stock_ins)
+    context.update({
+        'stock_ins': context['page']['object_list'],
+        'suppliers': Supplier.objects.all(),
     })
+    return render(request, 'inventory/stock-in-list.html', context)
 
 
 @login_required
@@ -100,14 +151,13 @@ def cancel_stock_in(request, id):
                 return redirect('stock_in_detail', id=id)
 
             if stock_in.approved_by:
-                inventory = Inventory.objects.select_for_update().get(product=stock_in.product)
-
-                if inventory.quantity < stock_in.quantity:
+                try:
+                    decrement_stock(stock_in.product_id, stock_in.quantity)
+                except InsufficientStock:
                     messages.error(request, 'Cannot cancel! The items were already stocked in but have since been sold.')
                     return redirect('stock_in_detail', id=id)
 
-                inventory.quantity -= stock_in.quantity
-                inventory.save()
+                record_stock_in(stock_in, sign=-1)
                 msg = f'The stock-in record has been cancelled and {stock_in.quantity} items have been withdrawn from inventory.'
 
             else:
@@ -135,16 +185,10 @@ def confirm_stock_in(request, id):
         if stock_in.approved_by or stock_in.is_disable:
             return redirect('stock_in_detail', id=id)
 
-        inventory, _ = Inventory.objects.select_for_update().get_or_create(
-            product=stock_in.product,
-            defaults={'quantity': 0}
-        )
-        inventory.quantity += stock_in.quantity
-        inventory.save()
-
         stock_in.approved_by = request.user
-        stock_in.updated_quantity = inventory.quantity
+        stock_in.updated_quantity = increment_stock(stock_in.product_id, stock_in.quantity)
         stock_in.save()
+        record_stock_in(stock_in)
 
     messages.success(request, 'Added Stock in successfully!')
     return redirect('stock_in_detail', id=id)
@@ -196,11 +240,13 @@ def print_stock_out(request, id):
 @login_required
 @user_role(['admin', 'warehouse'])
 def stock_out_list(request):
-    stock_outs = StockOut.objects.select_related('product', 'created_by', 'order')
-    return render(request, 'inventory/stock-out-list.html', {
-        'stock_outs': stock_outs,
+    stock_outs = StockOut.objects.select_related('product', 'created_by', 'approved_by', 'order')
+    context = _movement_page_context(request, stock_outs)
+    context.update({
+        'stock_outs': context['page']['object_list'],
         'type_choices': StockOut.TYPE_CHOICES,
     })
+    return render(request, 'inventory/stock-out-list.html', context)
 
 
 @login_required
@@ -229,7 +275,8 @@ def add_stock_out(request):
     else:
         form = StockOutForm()
 
-    products_stock = {inv.product.id: inv.quantity for inv in Inventory.objects.select_related('product')}
+    # Units reserved for pending orders cannot be stocked out
+    products_stock = dict(Inventory.objects.values_list('product_id', 'available'))
 
     return render(request, 'inventory/stock-out-form.html', {
         'form': form,
@@ -250,7 +297,7 @@ def stock_out_detail(request, id):
 @login_required
 @user_role(['admin'])
 def cancel_stock_out(request, id):
-    stock_out = get_object_or_404(StockOut, id=id)
+    stock_out = get_object_or_404(StockOut.objects.select_related('product', 'order'), id=id)
 
     if stock_out.order and stock_out.order.status != 'cancelled':
         messages.error(request, 'Cannot cancel stock out for an active order!')
@@ -258,13 +305,14 @@ def cancel_stock_out(request, id):
 
     try:
         with transaction.atomic():
-            inventory = Inventory.objects.get(product=stock_out.product)
-            inventory.quantity += stock_out.quantity
-            inventory.save()
-
-            stock_out.is_disable = True
-            stock_out.save(update_fields=['is_disable'])
-
+            # Chỉ hoàn kho một lần, kể cả khi có 2 request hủy cùng lúc
+            updated = StockOut.objects.filter(id=id, is_disable=False).update(is_disable=True)
+            if not updated:
+                messages.warning(request, 'Stock out is already cancelled!')
+                return redirect('stock_out_detail', id=id)
+
+            increment_stock(stock_out.product_id, stock_out.quantity)
+            record_stock_out(stock_out, sign=-1)
             messages.success(request, f'Stock out cancelled! Returned {stock_out.quantity} {stock_out.product.unit} {stock_out.product.name} to inventory!')
 
     except Exception as e:
@@ -1,6 +1,7 @@
 # apps/sales/admin.py
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import Order, OrderItem
+from .services import confirm_orders
 from apps.inventory.models import StockOut  # Dùng để xem StockOut liên quan
 
 
@@ -19,6 +20,7 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ('order_id', 'customer_name', 'customer_phone')
     readonly_fields = ('total_amount',)
     inlines = [OrderItemInline]
+    actions = ['confirm_selected_orders']
 
     fieldsets = (
         ("Thông tin Đơn hàng", {
@@ -42,6 +44,19 @@ class OrderAdmin(admin.ModelAdmin):
         obj.created_by = request.user
         super().save_model(request, obj, form, change)
 
+    @admin.action(description="Confirm selected pending orders (deduct stock)")
+    def confirm_selected_orders(self, request, queryset):
+        order_ids = list(queryset.filter(status='pending').values_list('id', flat=True))
+        confirmed, rejected = confirm_orders(order_ids, request.user, strict=False)
+
+        if confirmed:
+            self.message_user(request, f'{len(confirmed)} order(s) confirmed and stock deducted.', messages.SUCCESS)
+        for order, reason in rejected.items():
+            self.message_user(request, f'{order.order_id}: {reason}', messages.ERROR)
+        skipped = queryset.count() - len(order_ids)
+        if skipped:
+            self.message_user(request, f'{skipped} order(s) skipped because they are not pending.', messages.WARNING)
+
 
 # Thêm chức năng xem Phiếu xuất kho liên quan đến đơn hàng
 class StockOutInline(admin.TabularInline):
@@ -1,7 +1,7 @@
 # core/forms.py - UPDATED
 
 from django import forms
-from django.forms import inlineformset_factory
+from django.forms import inlineformset_factory, BaseInlineFormSet
 from .models import Order, OrderItem
 from apps.catalog.models import Product
 
@@ -53,6 +53,24 @@ class OrderForm(forms.ModelForm):
 
 # ==================== ORDER ITEM FORM ====================
 
+class PrefetchedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField that resolves submitted ids from a dict the formset loaded in one query"""
+
+    def __init__(self, *args, objects=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = objects
+
+    def to_python(self, value):
+        if self.objects is not None and value not in self.empty_values:
+            try:
+                obj = self.objects.get(int(value))
+            except (TypeError, ValueError):
+                obj = None
+            if obj is not None:
+                return obj
+        return super().to_python(value)
+
+
 class OrderItemForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(OrderItemForm, self).__init__(*args, **kwargs)
@@ -79,21 +97,75 @@ class OrderItemForm(forms.ModelForm):
             }),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, products=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.fields['product'].queryset = Product.objects.filter(is_active=True)
+        if products is not None:
+            field = self.fields['product']
+            self.fields['product'] = PrefetchedModelChoiceField(
+                field.queryset, objects=products, widget=field.widget, label=field.label,
+            )
 
         self.fields['product'].label_from_instance = lambda obj: \
             f"{obj.name} - {obj.code} (Available: {obj.inventory.quantity} {obj.unit})"
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        if isinstance(self.fields['product'], PrefetchedModelChoiceField):
+            # Already resolved against active products; skip the model's per-row FK EXISTS query
+            exclude.add('product')
+        return exclude
+
+    def validate_unique(self):
+        # (order, product) duplicates inside the submission are caught by the formset, and
+        # save_order() upserts on that pair, so skip the per-row EXISTS query
+        pass
+
 
 # ==================== ORDER ITEM FORMSET ====================
 
+class BaseOrderItemFormSet(BaseInlineFormSet):
+    """
+    Validates every row without a query per row: the submitted products and the order's
+    existing items are each loaded once and shared by all forms.
+    """
+
+    def _submitted_products(self):
+        if not hasattr(self, '_products'):
+            ids = set()
+            if self.is_bound:
+                for i in range(self.total_form_count()):
+                    value = self.data.get(f'{self.add_prefix(i)}-product')
+                    if value and str(value).isdigit():
+                        ids.add(int(value))
+            self._products = Product.objects.filter(is_active=True).in_bulk(ids) if ids else {}
+        return self._products
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if self.is_bound:
+            kwargs['products'] = self._submitted_products()
+        return kwargs
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        pk_name = self._pk_field.name
+        field = form.fields.get(pk_name)
+        if self.is_bound and isinstance(field, forms.ModelChoiceField):
+            if not hasattr(self, '_existing_items'):
+                self._existing_items = {obj.pk: obj for obj in self.get_queryset()}
+            form.fields[pk_name] = PrefetchedModelChoiceField(
+                field.queryset, objects=self._existing_items,
+                initial=field.initial, required=False, widget=field.widget,
+            )
+
+
 OrderItemFormSet = inlineformset_factory(
     Order,               # Parent model
     OrderItem,           # Child model
     form=OrderItemForm,  # Form for each item
+    formset=BaseOrderItemFormSet,
     extra=0,
     can_delete=True,
     min_num=1,
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.sales.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Create the order search index if needed and rebuild it from the orders table'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.ensure_index()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Order search index rebuilt ({backend.name})'))
@@ -0,0 +1,205 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Order
+
+SEARCH_FIELDS = ['order_id', 'customer_name', 'customer_phone', 'customer_email']
+# Only the best matches are ranked and paginated; narrow the query to see past them
+MAX_RESULTS = 1000
+# Trigram indexes cannot answer shorter terms
+MIN_TERM_LENGTH = 3
+
+
+class OrderSearchBackend:
+    """
+    Common interface of the order search backends.
+
+    search(query, limit, status) returns [(order pk, rank)], best match first, only among
+    orders in `status` when it is given (before the limit is applied). ensure_index()
+    creates the index if it is missing; index(orders) / remove(order_ids) keep it current
+    for backends that store their own copy of the searchable fields.
+    """
+    name = None
+
+    def ensure_index(self):
+        pass
+
+    def rebuild(self):
+        self.ensure_index()
+
+    def index(self, orders):
+        pass
+
+    def remove(self, order_ids):
+        pass
+
+    def search(self, query, limit=MAX_RESULTS, status=None):
+        raise NotImplementedError
+
+
+def substring_filter(query):
+    """Orders with `query` inside one of the search fields (case-insensitive), no fuzzy matching"""
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return condition
+
+
+class BasicSearchBackend(OrderSearchBackend):
+    """icontains over the search fields, newest first; used for other databases and very short queries"""
+    name = 'basic'
+
+    def search(self, query, limit=MAX_RESULTS, status=None):
+        orders = Order.objects.filter(substring_filter(query))
+        if status:
+            orders = orders.filter(status=status)
+        ids = orders.order_by('-created_at', '-id').values_list('id', flat=True)[:limit]
+        return [(pk, 0.0) for pk in ids]
+
+
+def _like_pattern(query):
+    escaped = query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class PostgresTrigramBackend(OrderSearchBackend):
+    """
+    pg_trgm GIN index over one lower-cased document of the search fields.
+
+    The index is on an expression of the order table itself, so PostgreSQL keeps it
+    current on every write. Matches are substrings (LIKE, e.g. part of a phone number)
+    or fuzzy words (word_similarity, e.g. a misspelt name), ranked by word similarity.
+    """
+    name = 'postgres_trigram'
+    index_name = 'sales_order_search_trgm'
+
+    def _document(self):
+        qn = connection.ops.quote_name
+        parts = " || ' ' || ".join(f"coalesce({qn(field)}, '')" for field in SEARCH_FIELDS)
+        return f'lower({parts})'
+
+    def ensure_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.index_name} ON {connection.ops.quote_name(Order._meta.db_table)} '
+                f'USING gin (({self._document()}) gin_trgm_ops)'
+            )
+
+    def search(self, query, limit=MAX_RESULTS, status=None):
+        query = query.strip()
+        if len(query) < MIN_TERM_LENGTH:
+            return BasicSearchBackend().search(query, limit, status)
+
+        document = self._document()
+        status_filter = ' AND status = %s' if status else ''
+        sql = (
+            f'SELECT id, word_similarity(lower(%s), {document}) AS rank '
+            f'FROM {connection.ops.quote_name(Order._meta.db_table)} '
+            f'WHERE (lower(%s) <%% {document} OR {document} LIKE %s){status_filter} '
+            f'ORDER BY rank DESC, created_at DESC LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [query, query, _like_pattern(query), *([status] if status else []), limit])
+            return [(pk, float(rank)) for pk, rank in cursor.fetchall()]
+
+
+class SQLiteFTS5Backend(OrderSearchBackend):
+    """
+    FTS5 table with the trigram tokenizer (substring matches, case-insensitive), keyed by
+    the order pk and ranked with bm25. It is a separate table, so it is written from the
+    Order post_save/post_delete signals in the same transaction as the order.
+    """
+    name = 'sqlite_fts5'
+    table = 'sales_order_search'
+
+    def ensure_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [self.table])
+            if cursor.fetchone():
+                return
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {self.table} USING fts5({", ".join(SEARCH_FIELDS)}, tokenize = "trigram")'
+            )
+        self.rebuild()
+
+    def rebuild(self):
+        columns = ', '.join(SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM {Order._meta.db_table}'
+            )
+
+    def index(self, orders):
+        orders = list(orders)
+        if not orders:
+            return
+        self.remove([order.pk for order in orders])
+        placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, {", ".join(SEARCH_FIELDS)}) VALUES ({placeholders})',
+                [[order.pk] + [getattr(order, field) or '' for field in SEARCH_FIELDS] for order in orders],
+            )
+
+    def remove(self, order_ids):
+        order_ids = list(order_ids)
+        if not order_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid IN ({", ".join(["%s"] * len(order_ids))})', order_ids
+            )
+
+    def search(self, query, limit=MAX_RESULTS, status=None):
+        terms = [term for term in query.split() if len(term) >= MIN_TERM_LENGTH]
+        short_terms = [term for term in query.split() if len(term) < MIN_TERM_LENGTH]
+        if not terms:
+            return BasicSearchBackend().search(query, limit, status)
+
+        # Every term must match somewhere; quoting keeps FTS5 operators in user input literal
+        match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        # Terms too short for the trigram index only filter the rows MATCH already found
+        document = " || ' ' || ".join(SEARCH_FIELDS)
+        short_filter = ''.join(f" AND ({document}) LIKE %s ESCAPE '\\'" for _ in short_terms)
+        status_filter = f' AND rowid IN (SELECT id FROM {Order._meta.db_table} WHERE status = %s)' if status else ''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, bm25({self.table}) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s{short_filter}{status_filter} ORDER BY rank LIMIT %s',
+                [match, *[_like_pattern(term) for term in short_terms], *([status] if status else []), limit],
+            )
+            # bm25 is lower for better matches
+            return [(pk, -score) for pk, score in cursor.fetchall()]
+
+
+BACKENDS = {backend.name: backend for backend in (
+    BasicSearchBackend,
+    PostgresTrigramBackend,
+    SQLiteFTS5Backend,
+)}
+VENDOR_BACKENDS = {
+    'postgresql': PostgresTrigramBackend.name,
+    'sqlite': SQLiteFTS5Backend.name,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """settings.ORDER_SEARCH_BACKEND, or the best backend for the database in use"""
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'ORDER_SEARCH_BACKEND', None) or VENDOR_BACKENDS.get(connection.vendor, 'basic')
+        try:
+            _backend = BACKENDS[name]()
+        except KeyError:
+            raise ValueError(f"Unknown order search backend '{name}'. Choices: {', '.join(BACKENDS)}")
+    return _backend
+
+
+def search_orders(query, limit=MAX_RESULTS, status=None):
+    return get_search_backend().search(query, limit, status)
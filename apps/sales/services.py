@@ -0,0 +1,268 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .models import Order, OrderItem
+from ..authentication.dashboard_cache import bump_version
+from ..inventory.models import StockOut, StockReservation
+from ..inventory.services import (
+    lock_inventory, apply_stock_deltas, record_movements,
+    reserve_stock, release_reservations, StockReservationError,
+)
+
+
+class OrderConfirmationError(ValueError):
+    pass
+
+
+class OrderValidationError(ValueError):
+    pass
+
+
+# Trạng thái hiện tại -> các trạng thái được phép chuyển sang
+ORDER_TRANSITIONS = {
+    'pending': ['processing', 'cancelled'],
+    'processing': ['shipping', 'cancelled'],
+    'shipping': ['delivered', 'cancelled'],
+}
+
+
+def confirm_orders(order_ids, user, strict=True):
+    """
+    Set-based confirmation of one or many pending orders.
+
+    1. Lock the pending orders, their reservations and every affected Inventory row
+       (in product_id order).
+    2. Validate all lines in memory: an order may use the available stock plus what it
+       has reserved itself.
+    3. Deduct stock and consume the reservations for all products with a single UPDATE.
+    4. bulk_create the StockOut rows and flip the orders to 'processing'.
+
+    With strict=True any rejected order aborts the whole batch (single order confirm).
+    Otherwise orders without enough stock are skipped and reported.
+    Returns (confirmed_orders, {order: reason}).
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(id__in=order_ids, status='pending')
+            .order_by('id')
+        )
+        if not orders:
+            return [], {}
+
+        items_by_order = defaultdict(list)
+        for item in OrderItem.objects.filter(order__in=orders).select_related('product').order_by('id'):
+            items_by_order[item.order_id].append(item)
+
+        held, reservation_ids = defaultdict(dict), defaultdict(list)
+        for pk, order_id, product_id, quantity in (StockReservation.objects.select_for_update()
+                                                  .filter(order__in=orders)
+                                                  .values_list('id', 'order_id', 'product_id', 'quantity')):
+            held[order_id][product_id] = quantity
+            reservation_ids[order_id].append(pk)
+
+        locked = lock_inventory(
+            [item.product_id for items in items_by_order.values() for item in items]
+            + [product_id for holds in held.values() for product_id in holds]
+        )
+        stock = {product_id: quantity for product_id, (quantity, _) in locked.items()}
+        available = {product_id: quantity - reserved for product_id, (quantity, reserved) in locked.items()}
+
+        confirmed, rejected = [], {}
+        deltas, reserved_deltas = defaultdict(int), defaultdict(int)
+        consumed = []
+        stock_outs = []
+        now = timezone.now()
+
+        for order in orders:
+            items = items_by_order.get(order.id, [])
+            if not items:
+                rejected[order] = 'Order has no items!'
+                continue
+
+            needed = defaultdict(int)
+            for item in items:
+                needed[item.product_id] += item.quantity
+
+            holds = held.get(order.id, {})
+            usable = {
+                product_id: available.get(product_id, 0) + holds.get(product_id, 0)
+                for product_id in needed
+            }
+            shortages = [
+                f'{item.product.name} (Remaining: {usable[item.product_id]})'
+                for item in items
+                if usable[item.product_id] < needed[item.product_id]
+            ]
+            if shortages:
+                rejected[order] = f'Insufficient stock! {", ".join(shortages)}'
+                continue
+
+            # The order's own reservation is consumed by the stock-out
+            for product_id, quantity in holds.items():
+                available[product_id] += quantity
+                reserved_deltas[product_id] -= quantity
+            consumed.extend(reservation_ids[order.id])
+            for product_id, quantity in needed.items():
+                available[product_id] -= quantity
+
+            for item in items:
+                stock[item.product_id] -= item.quantity
+                deltas[item.product_id] -= item.quantity
+                stock_outs.append(StockOut(
+                    product_id=item.product_id,
+                    order=order,
+                    quantity=item.quantity,
+                    updated_quantity=stock[item.product_id],
+                    approved_by=user,
+                    created_by=user,
+                    note=f'Stock out for order {order.order_id}',
+                ))
+            confirmed.append(order)
+
+        if strict and rejected:
+            raise OrderConfirmationError('; '.join(rejected.values()))
+
+        StockReservation.objects.filter(id__in=consumed).delete()
+        apply_stock_deltas(deltas, reserved=reserved_deltas)
+        StockOut.objects.bulk_create(stock_outs)
+        record_movements((so.product_id, so.created_at, 0, so.quantity) for so in stock_outs)
+        Order.objects.filter(id__in=[order.id for order in confirmed]).update(status='processing', updated_at=now)
+        for order in confirmed:
+            order.status = 'processing'
+
+    return confirmed, rejected
+
+
+def save_order(order, lines):
+    """
+    Write an order with all of its items and reserve their stock in a fixed number of queries.
+
+    `lines` is a list of (product, quantity, unit_price), one per product.
+    1. Sum the Decimal subtotals into order.total_amount and save the order.
+    2. For an existing order, delete the items whose product is no longer listed, then
+       upsert the rest on (order, product); a new order gets a plain bulk_create.
+    3. Release the order's previous reservations (when editing) and reserve the new
+       quantities with one conditional UPDATE, so two pending orders can never be
+       promised the same units.
+    Raises OrderValidationError listing every line without enough stock.
+    """
+    product_ids = [product.id for product, _, _ in lines]
+    if len(set(product_ids)) != len(product_ids):
+        raise OrderValidationError('Each product can only appear once in an order!')
+
+    total_amount = Decimal('0')
+    items = []
+    for product, quantity, unit_price in lines:
+        subtotal = quantity * Decimal(unit_price)
+        total_amount += subtotal
+        items.append(OrderItem(product=product, quantity=quantity, unit_price=unit_price, subtotal=subtotal))
+
+    with transaction.atomic():
+        is_new = order.pk is None
+        order.total_amount = total_amount
+        order.save()
+        for item in items:
+            item.order = order
+
+        if is_new:
+            OrderItem.objects.bulk_create(items)
+        else:
+            release_reservations([order.pk])
+            OrderItem.objects.filter(order=order).exclude(product_id__in=product_ids).delete()
+            OrderItem.objects.bulk_create(
+                items,
+                update_conflicts=True,
+                unique_fields=['order', 'product'],
+                update_fields=['quantity', 'unit_price', 'subtotal'],
+            )
+
+        try:
+            reserve_stock(order, {product.id: quantity for product, quantity, _ in lines})
+        except StockReservationError as e:
+            names = {product.id: product.name for product, _, _ in lines}
+            shortages = [f'{names[product_id]} (Remaining: {available})' for product_id, available in e.shortages.items()]
+            raise OrderValidationError(f'Not enough stock! {", ".join(shortages)}')
+
+        # bulk_create does not send post_save
+        bump_version()
+
+    return order
+
+
+def _cancel_orders(orders_by_status):
+    """
+    Side effects of cancelling many orders, set-based:
+    pending orders release their reservations; processing/shipping orders get their
+    active StockOuts disabled and the stock back with one UPDATE, and the daily
+    rollup is corrected once for the whole batch.
+    """
+    release_reservations(orders_by_status.get('pending', []))
+
+    shipped_ids = orders_by_status.get('processing', []) + orders_by_status.get('shipping', [])
+    if not shipped_ids:
+        return
+    stock_outs = StockOut.objects.select_for_update().filter(order_id__in=shipped_ids, is_disable=False)
+    returned = list(stock_outs.values_list('product_id', 'quantity', 'created_at'))
+    stock_outs.update(
+        is_disable=True,
+        note=Concat(
+            Value('Auto-cancelled because Order #'), Cast('order_id', CharField()), Value(' was cancelled.'),
+            output_field=CharField(),
+        ),
+    )
+    record_movements((product_id, created_at, 0, -quantity) for product_id, quantity, created_at in returned)
+
+    deltas = defaultdict(int)
+    for product_id, quantity, _ in returned:
+        deltas[product_id] += quantity
+    apply_stock_deltas(deltas)
+
+
+def transition_orders(order_ids, new_status, user):
+    """
+    Move many orders to `new_status` at once.
+
+    The orders are locked and checked against ORDER_TRANSITIONS in memory, then every
+    eligible one is flipped with a single UPDATE ... WHERE id IN (...) AND status IN (allowed).
+    pending -> processing is a confirmation and goes through confirm_orders (stock is
+    deducted); cancelling returns stock / releases reservations for the whole batch at once.
+    Returns (updated_ids, {order_id: reason}) for the orders that were not moved.
+    """
+    sources = [status for status, targets in ORDER_TRANSITIONS.items() if new_status in targets]
+    if not sources:
+        raise ValueError(f'Invalid status "{new_status}"')
+
+    order_ids = list(order_ids)
+    with transaction.atomic():
+        current = dict(Order.objects.select_for_update().filter(id__in=order_ids).values_list('id', 'status'))
+        rejected = {order_id: 'Order not found' for order_id in order_ids if order_id not in current}
+        by_status = defaultdict(list)
+        for order_id, status in current.items():
+            if status in sources:
+                by_status[status].append(order_id)
+            else:
+                rejected[order_id] = f'Cannot change status from "{status}" to "{new_status}"'
+
+        eligible = [order_id for ids in by_status.values() for order_id in ids]
+        if not eligible:
+            return [], rejected
+
+        if new_status == 'processing':
+            confirmed, failed = confirm_orders(eligible, user, strict=False)
+            rejected.update({order.id: reason for order, reason in failed.items()})
+            return [order.id for order in confirmed], rejected
+
+        if new_status == 'cancelled':
+            _cancel_orders(by_status)
+
+        Order.objects.filter(id__in=eligible, status__in=sources).update(status=new_status, updated_at=timezone.now())
+        # update() does not send post_save
+        bump_version()
+
+    return eligible, rejected
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete, pre_delete, post_migrate
+from django.dispatch import receiver
+
+from .models import Order, OrderItem
+from .search import SEARCH_FIELDS, get_search_backend
+from ..authentication.dashboard_cache import bump_version
+from ..inventory.services import release_reservations
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_dashboard_cache(sender, **kwargs):
+    bump_version()
+
+
+@receiver(pre_delete, sender=Order)
+def release_order_reservations(sender, instance, **kwargs):
+    # Give the units back before the reservations are cascade-deleted with the order
+    release_reservations([instance.pk])
+
+
+@receiver(post_save, sender=Order)
+def index_order(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_migrate)
+def ensure_order_search_index(sender, **kwargs):
+    if sender.label == 'sales':
+        get_search_backend().ensure_index()
@@ -1,3 +1,219 @@
+from decimal import Decimal
+
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.authentication.models import User
+from apps.catalog.models import Category, Product
+from apps.inventory.models import Inventory, StockMovementDaily, StockOut, StockReservation
+
+from .models import Order, OrderItem
+from .services import (
+    OrderConfirmationError, OrderValidationError, confirm_orders, save_order, transition_orders,
+)
+
+
+class OrderServiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('sales', 'sales@example.com', 'pw', role='sales')
+        category = Category.objects.create(category_id='C1', name='Category')
+        self.mouse = Product.objects.create(product_id='P1', name='Mouse', category=category, unit='pc',
+                                            price=Decimal('10.00'))
+        self.cable = Product.objects.create(product_id='P2', name='Cable', category=category, unit='pc',
+                                            price=Decimal('2.50'))
+        Inventory.objects.create(product=self.mouse, quantity=10)
+        Inventory.objects.create(product=self.cable, quantity=5)
+
+    def new_order(self, order_id='DH001'):
+        return Order(order_id=order_id, customer_name='Khach', customer_email='k@example.com',
+                     customer_phone='0900000000', customer_address='HN', created_by=self.user)
+
+    def stock(self, product):
+        inventory = Inventory.objects.get(product=product)
+        return inventory.quantity, inventory.reserved, inventory.available
+
+    # ---------- save_order ----------
+    def test_save_order_writes_items_and_reserves_stock(self):
+        order = save_order(self.new_order(), [(self.mouse, 3, Decimal('10.00')), (self.cable, 2, Decimal('2.50'))])
+
+        self.assertEqual(order.total_amount, Decimal('35.00'))
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(self.stock(self.mouse), (10, 3, 7))
+        self.assertEqual(self.stock(self.cable), (5, 2, 3))
+        self.assertEqual(StockReservation.objects.filter(order=order).count(), 2)
+
+    def test_save_order_rejects_shortage_without_reserving_anything(self):
+        with self.assertRaisesMessage(OrderValidationError, 'Cable (Remaining: 5)'):
+            save_order(self.new_order(), [(self.mouse, 3, Decimal('10.00')), (self.cable, 6, Decimal('2.50'))])
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(self.stock(self.mouse), (10, 0, 10))
+
+    def test_save_order_rejects_duplicate_products(self):
+        with self.assertRaises(OrderValidationError):
+            save_order(self.new_order(), [(self.mouse, 1, Decimal('10.00')), (self.mouse, 2, Decimal('10.00'))])
+
+    def test_reserved_units_cannot_be_promised_twice(self):
+        save_order(self.new_order('DH001'), [(self.mouse, 8, Decimal('10.00'))])
+
+        with self.assertRaisesMessage(OrderValidationError, 'Mouse (Remaining: 2)'):
+            save_order(self.new_order('DH002'), [(self.mouse, 3, Decimal('10.00'))])
+
+    def test_editing_an_order_replaces_its_reservation(self):
+        order = save_order(self.new_order(), [(self.mouse, 3, Decimal('10.00')), (self.cable, 2, Decimal('2.50'))])
+
+        save_order(order, [(self.mouse, 9, Decimal('10.00'))])
+
+        self.assertEqual(list(order.items.values_list('product_id', 'quantity')), [(self.mouse.id, 9)])
+        self.assertEqual(self.stock(self.mouse), (10, 9, 1))
+        self.assertEqual(self.stock(self.cable), (5, 0, 5))
+
+    # ---------- confirm_orders ----------
+    def test_confirm_consumes_reservation_and_deducts_stock(self):
+        order = save_order(self.new_order(), [(self.mouse, 3, Decimal('10.00'))])
+
+        confirmed, rejected = confirm_orders([order.id], self.user)
+
+        self.assertEqual((confirmed, rejected), ([order], {}))
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'processing')
+        self.assertEqual(self.stock(self.mouse), (7, 0, 7))
+        self.assertFalse(StockReservation.objects.exists())
+        stock_out = StockOut.objects.get(order=order)
+        self.assertEqual((stock_out.quantity, stock_out.updated_quantity), (3, 7))
+        self.assertEqual(StockMovementDaily.objects.get(product=self.mouse).stock_out, 3)
+
+    def test_strict_confirm_rejects_the_whole_batch(self):
+        ok = save_order(self.new_order('DH001'), [(self.mouse, 3, Decimal('10.00'))])
+        short = self.new_order('DH002')
+        short.save()
+        OrderItem.objects.create(order=short, product=self.cable, quantity=6, unit_price=Decimal('2.50'))
+
+        with self.assertRaisesMessage(OrderConfirmationError, 'Cable (Remaining: 5)'):
+            confirm_orders([ok.id, short.id], self.user)
+
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'pending'})
+        self.assertEqual(self.stock(self.mouse), (10, 3, 7))
+        self.assertFalse(StockOut.objects.exists())
+
+    def test_lenient_confirm_skips_orders_without_stock(self):
+        ok = save_order(self.new_order('DH001'), [(self.mouse, 3, Decimal('10.00'))])
+        short = self.new_order('DH002')
+        short.save()
+        OrderItem.objects.create(order=short, product=self.cable, quantity=6, unit_price=Decimal('2.50'))
+
+        confirmed, rejected = confirm_orders([ok.id, short.id], self.user, strict=False)
+
+        self.assertEqual([order.id for order in confirmed], [ok.id])
+        self.assertEqual([order.id for order in rejected], [short.id])
+        self.assertEqual(Order.objects.get(id=short.id).status, 'pending')
+        self.assertEqual(self.stock(self.cable), (5, 0, 5))
+
+    # ---------- transition_orders ----------
+    def test_cancelling_a_pending_order_releases_its_reservation(self):
+        order = save_order(self.new_order(), [(self.mouse, 4, Decimal('10.00'))])
+
+        updated, rejected = transition_orders([order.id], 'cancelled', self.user)
+
+        self.assertEqual((updated, rejected), ([order.id], {}))
+        self.assertEqual(Order.objects.get(id=order.id).status, 'cancelled')
+        self.assertEqual(self.stock(self.mouse), (10, 0, 10))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_cancelling_a_confirmed_order_returns_stock_and_corrects_rollup(self):
+        order = save_order(self.new_order(), [(self.mouse, 4, Decimal('10.00'))])
+        transition_orders([order.id], 'processing', self.user)
+        self.assertEqual(self.stock(self.mouse), (6, 0, 6))
+
+        updated, _ = transition_orders([order.id], 'cancelled', self.user)
+
+        self.assertEqual(updated, [order.id])
+        self.assertEqual(self.stock(self.mouse), (10, 0, 10))
+        self.assertTrue(StockOut.objects.get(order=order).is_disable)
+        self.assertEqual(StockMovementDaily.objects.get(product=self.mouse).stock_out, 0)
+
+    def test_transition_reports_orders_it_cannot_move(self):
+        pending = save_order(self.new_order('DH001'), [(self.mouse, 1, Decimal('10.00'))])
+        shipping = save_order(self.new_order('DH002'), [(self.cable, 1, Decimal('2.50'))])
+        transition_orders([shipping.id], 'processing', self.user)
+        transition_orders([shipping.id], 'shipping', self.user)
+
+        updated, rejected = transition_orders([pending.id, shipping.id, 999], 'delivered', self.user)
+
+        self.assertEqual(updated, [shipping.id])
+        self.assertEqual(rejected[999], 'Order not found')
+        self.assertIn('from "pending" to "delivered"', rejected[pending.id])
+        self.assertEqual(Order.objects.get(id=pending.id).status, 'pending')
+
+    def test_transition_to_unknown_status_raises(self):
+        with self.assertRaises(ValueError):
+            transition_orders([], 'lost', self.user)
+
+    def test_deleting_an_order_releases_its_reservation(self):
+        order = save_order(self.new_order(), [(self.mouse, 5, Decimal('10.00'))])
+
+        order.delete()
+
+        self.assertEqual(self.stock(self.mouse), (10, 0, 10))
+
+    def test_cancel_view_returns_stock_of_a_confirmed_order(self):
+        self.user.role = 'admin'
+        self.user.save()
+        self.client.force_login(self.user)
+        order = save_order(self.new_order(), [(self.mouse, 4, Decimal('10.00'))])
+        transition_orders([order.id], 'processing', self.user)
+
+        self.client.get(reverse('cancel_order', args=[order.id]))
+
+        self.assertEqual(Order.objects.get(id=order.id).status, 'cancelled')
+        self.assertEqual(self.stock(self.mouse), (10, 0, 10))
+        self.assertEqual(StockMovementDaily.objects.get(product=self.mouse).stock_out, 0)
+
+    def test_cancel_view_leaves_a_delivered_order_and_its_rollup_alone(self):
+        self.user.role = 'admin'
+        self.user.save()
+        self.client.force_login(self.user)
+        order = save_order(self.new_order(), [(self.mouse, 4, Decimal('10.00'))])
+        for status in ('processing', 'shipping', 'delivered'):
+            transition_orders([order.id], status, self.user)
+
+        self.client.get(reverse('cancel_order', args=[order.id]))
+
+        self.assertEqual(Order.objects.get(id=order.id).status, 'delivered')
+        self.assertEqual(self.stock(self.mouse), (6, 0, 6))
+        self.assertEqual(StockMovementDaily.objects.get(product=self.mouse).stock_out, 4)
+
+
+class BulkStatusViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admin', 'admin@example.com', 'pw', role='admin')
+        self.client.force_login(self.user)
+        for order_id in ('DH001', 'DH002'):
+            Order.objects.create(order_id=order_id, customer_name='Khach', customer_email='k@example.com',
+                                 customer_phone='0900000000', customer_address='HN')
+
+    def test_filtered_scope_without_a_filter_is_refused(self):
+        response = self.client.post(reverse('bulk_update_status'), {'scope': 'filtered', 'new_status': 'cancelled'},
+                                    HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.filter(status='cancelled').exists())
+
+    def test_filtered_scope_moves_matching_orders(self):
+        response = self.client.post(reverse('bulk_update_status'),
+                                    {'scope': 'filtered', 'status': 'pending', 'new_status': 'cancelled'},
+                                    HTTP_ACCEPT='application/json')
+
+        self.assertEqual(len(response.json()['updated']), 2)
+        self.assertEqual(Order.objects.filter(status='cancelled').count(), 2)
+
+    def test_filtered_scope_matches_search_text_exactly(self):
+        Order.objects.filter(order_id='DH002').update(customer_name='Tran Thi Bich')
+
+        response = self.client.post(reverse('bulk_update_status'),
+                                    {'scope': 'filtered', 'q': 'thi bich', 'new_status': 'cancelled'},
+                                    HTTP_ACCEPT='application/json')
 
-# Create your tests here.
+        self.assertEqual(len(response.json()['updated']), 1)
+        self.assertEqual(Order.objects.get(status='cancelled').order_id, 'DH002')
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('orders/', views.order_list, name='order_list'),
+    path('orders/bulk-status/', views.bulk_update_status, name='bulk_update_status'),
     path('order/add/', views.add_order, name='add_order'),
     path('order/<int:id>/', views.order_detail, name='order_detail'),
     path('order/<int:id>/confirm/', views.confirm_order, name='confirm_order'),
@@ -1,33 +1,156 @@
 from datetime import datetime
+from urllib.parse import urlencode
 import uuid
 
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 
 from .forms import OrderItemFormSet, OrderForm
 from .models import Order
+from .search import search_orders, substring_filter
+from .services import confirm_orders, save_order, transition_orders, OrderConfirmationError, ORDER_TRANSITIONS
 from ..authentication.views import user_role
-from ..catalog.models import Product
-from ..inventory.models import Inventory, StockOut
+from ..inventory.pagination import keyset_paginate, PAGE_SIZE
+
+
+LIST_STATUS_CHOICES = [
+    ('pending', 'Pending'),
+    ('processing', 'Processing'),
+    ('shipping', 'Shipping'),
+    ('delivered', 'Delivered'),
+    ('cancelled', 'Cancelled'),
+]
+BULK_STATUS_CHOICES = [
+    ('processing', 'Confirm (deduct stock)'),
+    ('shipping', 'Shipping'),
+    ('delivered', 'Delivered'),
+    ('cancelled', 'Cancelled'),
+]
+MAX_REPORTED_REJECTIONS = 10
+
+
+def _list_filters(params):
+    filters = {key: params.get(key, '').strip() for key in ('q', 'status')}
+    return {key: value for key, value in filters.items() if value}
+
+
+def _filtered_orders(filters, exact=False):
+    """
+    Orders matching the order list filters, shared by the list and the bulk status update.
+    Also returns the search hits [(pk, rank)] for `q`, best first (None without a query).
+
+    The list uses the ranked search, capped at search.MAX_RESULTS and filtered by status
+    inside the search. Bulk actions pass exact=True: `q` is then a plain substring match
+    over the search fields with no cap, so fuzzy hits are never changed by mistake.
+    """
+    orders = Order.objects.all()
+    if filters.get('status'):
+        orders = orders.filter(status=filters['status'])
+
+    hits = None
+    if filters.get('q'):
+        if exact:
+            orders = orders.filter(substring_filter(filters['q']))
+        else:
+            hits = search_orders(filters['q'], status=filters.get('status'))
+            orders = orders.filter(id__in=[pk for pk, _ in hits])
+    return orders, hits
+
+
+def _order_list_url(params):
+    filters = _list_filters(params)
+    url = reverse('order_list')
+    return f'{url}?{urlencode(filters)}' if filters else url
 
 
 @login_required
 def order_list(request):
-    status = request.GET.get('status', '')
-    orders = Order.objects.all().order_by('-created_at')
-
-    if status:
-        orders = orders.filter(status=status)
+    filters = _list_filters(request.GET)
+    orders, hits = _filtered_orders(filters)
+
+    page, search_page = None, None
+    if hits is None:
+        page = keyset_paginate(
+            orders,
+            cursor=request.GET.get('cursor'),
+            direction=request.GET.get('dir', 'next'),
+            page_size=request.GET.get('page_size') or PAGE_SIZE,
+        )
+        rows = page['object_list']
+    else:
+        # The hit list is capped (search.MAX_RESULTS), so rank order is kept and paged in memory
+        matching = set(orders.values_list('id', flat=True))
+        search_page = Paginator([pk for pk, _ in hits if pk in matching], PAGE_SIZE).get_page(request.GET.get('page'))
+        by_id = Order.objects.in_bulk(search_page.object_list)
+        rows = [by_id[pk] for pk in search_page.object_list if pk in by_id]
 
     context = {
-        'orders': orders,
-        'status_choices': Order.STATUS_CHOICES,
+        'orders': rows,
+        'page': page,
+        'search_page': search_page,
+        'filters': filters,
+        'filter_query': urlencode(filters),
+        'status_choices': LIST_STATUS_CHOICES,
+        'bulk_status_choices': BULK_STATUS_CHOICES,
     }
     return render(request, 'sales/order-list.html', context)
 
 
+@login_required
+@user_role(['admin', 'sales'])
+@require_POST
+def bulk_update_status(request):
+    """
+    Move the selected orders (order_ids) or every order matching the list filter
+    (scope=filtered, which needs a search or status filter) to one status. Answers JSON when asked for it, otherwise
+    redirects back to the list with a summary.
+    """
+    new_status = request.POST.get('new_status')
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+    if request.POST.get('scope') == 'filtered':
+        filters = _list_filters(request.POST)
+        if not filters:
+            # An empty filter matches every order in the system
+            error = 'Search or filter by status before applying to all matching orders!'
+            if wants_json:
+                return JsonResponse({'success': False, 'error': error}, status=400)
+            messages.error(request, error)
+            return redirect(_order_list_url(request.POST))
+        orders, _ = _filtered_orders(filters, exact=True)
+        order_ids = list(orders.values_list('id', flat=True))
+    else:
+        order_ids = [int(pk) for pk in request.POST.getlist('order_ids') if pk.isdigit()]
+
+    if not order_ids or new_status not in dict(BULK_STATUS_CHOICES):
+        if wants_json:
+            return JsonResponse({'success': False, 'error': 'No orders or invalid status'}, status=400)
+        messages.error(request, 'Please select orders and a valid status!')
+        return redirect(_order_list_url(request.POST))
+
+    updated, rejected = transition_orders(order_ids, new_status, request.user)
+
+    if wants_json:
+        return JsonResponse({
+            'success': True,
+            'status': new_status,
+            'updated': updated,
+            'rejected': {str(order_id): reason for order_id, reason in rejected.items()},
+        })
+
+    if updated:
+        messages.success(request, f'{len(updated)} order(s) updated to "{new_status}"!')
+    for order_id, reason in list(rejected.items())[:MAX_REPORTED_REJECTIONS]:
+        messages.error(request, f'Order #{order_id}: {reason}')
+    if len(rejected) > MAX_REPORTED_REJECTIONS:
+        messages.warning(request, f'...and {len(rejected) - MAX_REPORTED_REJECTIONS} more order(s) were skipped.')
+    return redirect(_order_list_url(request.POST))
+
+
 @user_role(['admin', 'sales'])
 @login_required
 def order_detail(request, id):
@@ -51,21 +174,13 @@ def confirm_order(request, id):
         return redirect('order_detail', id=id)
 
     try:
-        with transaction.atomic():
-            for item in order.items.all():
-                StockOut.objects.create(
-                    product=item.product,
-                    order=order,
-                    quantity=item.quantity,
-                    approved_by=request.user,
-                    created_by=request.user,
-                    note=f'Stock out for order {order.order_id}',
-                )
-
-            order.status = 'processing'
-            order.save()
-
+        confirmed, _ = confirm_orders([order.id], request.user)
+        if confirmed:
             messages.success(request, 'Order confirmed and stock deducted successfully!')
+        else:
+            messages.warning(request, 'This order has already been processed!')
+    except OrderConfirmationError as e:
+        messages.error(request, str(e))
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
 
@@ -77,29 +192,14 @@ def confirm_order(request, id):
 def cancel_order(request, id):
     order = get_object_or_404(Order, id=id)
 
-    if order.status == 'completed':
-        messages.error(request, 'Cannot cancel a completed order!')
-        return redirect('order_detail', id=id)
-
+    # Same path as the bulk action: pending orders release their reservations, confirmed
+    # ones get their stock back and the daily rollup corrected; delivered orders are refused
     try:
-        with transaction.atomic():
-            stock_out = StockOut.objects.filter(order=order).first()
-            if stock_out:
-                if not stock_out.is_disable:
-                    if hasattr(stock_out, 'note'):
-                        stock_out.note = f"Auto-cancelled because Order #{order.id} was cancelled by Admin."
-                    stock_out.is_disable = True
-                    stock_out.save()
-            if order.status in ['processing', 'shipping']:
-                for item in order.items.all():
-                    inventory = Inventory.objects.get(product=item.product)
-                    inventory.quantity += item.quantity
-                    inventory.save()
-
-            order.status = 'cancelled'
-            order.save()
-
+        updated, rejected = transition_orders([order.id], 'cancelled', request.user)
+        if updated:
             messages.success(request, 'Order cancelled successfully!')
+        else:
+            messages.error(request, rejected.get(order.id, 'Cannot cancel this order!'))
     except Exception as e:
         messages.error(request, f'Error: {str(e)}')
 
@@ -114,22 +214,28 @@ def order_update_status(request, id):
     if request.method == 'POST':
         new_status = request.POST.get('status')
 
-        valid_transitions = {
-            'pending': ['processing', 'cancelled'],
-            'processing': ['shipping', 'cancelled'],
-            'shipping': ['delivered', 'cancelled'],
-        }
-
-        if order.status in valid_transitions and new_status in valid_transitions[order.status]:
-            order.status = new_status
-            order.save()
-            messages.success(request, f'Order status updated to "{order.get_status_display()}"!')
+        if order.status in ORDER_TRANSITIONS and new_status in ORDER_TRANSITIONS[order.status]:
+            updated, rejected = transition_orders([order.id], new_status, request.user)
+            if updated:
+                order.refresh_from_db(fields=['status'])
+                messages.success(request, f'Order status updated to "{order.get_status_display()}"!')
+            else:
+                messages.error(request, rejected.get(order.id, 'Invalid status transition!'))
         else:
             messages.error(request, 'Invalid status transition!')
 
     return redirect('order_detail', id=id)
 
 
+def _formset_lines(formset):
+    """(product, quantity, unit_price) for every row that is not marked for deletion"""
+    return [
+        (form.cleaned_data['product'], form.cleaned_data['quantity'], form.cleaned_data['unit_price'])
+        for form in formset
+        if form.cleaned_data and not form.cleaned_data.get('DELETE')
+    ]
+
+
 @login_required
 @user_role(['admin', 'sales'])
 def add_order(request):
@@ -139,36 +245,13 @@ def add_order(request):
 
         if order_form.is_valid() and order_item_formset.is_valid():
             try:
-                with transaction.atomic():
-                    order = order_form.save(commit=False)
-                    order.order_id = f"DH{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
-                    order.created_by = request.user
-
-                    total_amount = 0
-                    for item_form in order_item_formset:
-                        if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                            quantity = item_form.cleaned_data['quantity']
-                            unit_price = item_form.cleaned_data['unit_price']
-                            total_amount += quantity * unit_price
-
-                            product = item_form.cleaned_data['product']
-                            inventory = Inventory.objects.get(product=product)
-
-                            if inventory.quantity < quantity:
-                                raise ValueError(f'Product {product.name} does not have enough stock! (Remaining: {inventory.quantity})')
+                order = order_form.save(commit=False)
+                order.order_id = f"DH{datetime.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:6].upper()}"
+                order.created_by = request.user
+                save_order(order, _formset_lines(order_item_formset))
 
-                    order.total_amount = total_amount
-                    order.save()
-
-                    order_item_formset.instance = order
-                    order_items = order_item_formset.save(commit=False)
-
-                    for item in order_items:
-                        item.subtotal = item.quantity * item.unit_price
-                        item.save()
-
-                    messages.success(request, f'Order {order.order_id} created successfully!')
-                    return redirect('order_detail', id=order.id)
+                messages.success(request, f'Order {order.order_id} created successfully!')
+                return redirect('order_detail', id=order.id)
 
             except ValueError as e:
                 messages.error(request, str(e))
@@ -181,28 +264,9 @@ def add_order(request):
         order_form = OrderForm()
         order_item_formset = OrderItemFormSet()
 
-    products = Product.objects.filter(is_active=True).select_related('category', 'inventory')
-    products_data = []
-
-    for product in products:
-        try:
-            stock = product.inventory.quantity
-        except Inventory.DoesNotExist:
-            stock = 0
-
-        products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'product_id': product.product_id,
-            'price': float(product.price),
-            'unit': product.unit,
-            'stock': stock,
-        })
-
     context = {
         'order_form': order_form,
         'order_item_formset': order_item_formset,
-        'products_data': products_data,
         'title': 'Create New Order',
     }
 
@@ -224,36 +288,11 @@ def edit_order(request, id):
 
         if order_form.is_valid() and order_item_formset.is_valid():
             try:
-                with transaction.atomic():
-                    order = order_form.save(commit=False)
+                order = order_form.save(commit=False)
+                save_order(order, _formset_lines(order_item_formset))
 
-                    total_amount = 0
-                    for item_form in order_item_formset:
-                        if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                            quantity = item_form.cleaned_data['quantity']
-                            unit_price = item_form.cleaned_data['unit_price']
-                            total_amount += quantity * unit_price
-
-                            product = item_form.cleaned_data['product']
-                            inventory = Inventory.objects.get(product=product)
-
-                            if inventory.quantity < quantity:
-                                raise ValueError(f'Product {product.name} does not have enough stock!')
-
-                    order.total_amount = total_amount
-                    order.save()
-
-                    order_items = order_item_formset.save(commit=False)
-
-                    for item in order_item_formset.deleted_objects:
-                        item.delete()
-
-                    for item in order_items:
-                        item.subtotal = item.quantity * item.unit_price
-                        item.save()
-
-                    messages.success(request, 'Order updated successfully!')
-                    return redirect('order_detail', id=id)
+                messages.success(request, 'Order updated successfully!')
+                return redirect('order_detail', id=id)
             except ValueError as e:
                 messages.error(request, str(e))
             except Exception as e:
@@ -264,28 +303,12 @@ def edit_order(request, id):
         order_form = OrderForm(instance=order)
         order_item_formset = OrderItemFormSet(instance=order)
 
-    products = Product.objects.filter(is_active=True).select_related('category')
-    products_data = []
-
-    for product in products:
-        try:
-            stock = product.inventory.quantity
-        except:
-            stock = 0
-
-        products_data.append({
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'unit': product.unit,
-            'stock': stock,
-        })
-
     context = {
         'order': order,
         'order_form': order_form,
         'order_item_formset': order_item_formset,
-        'products_data': products_data,
+        # Units this order already holds are available to it on top of the snapshot stock
+        'held_stock': dict(order.reservations.values_list('product_id', 'quantity')),
         'title': f'Edit Order {order.order_id}',
     }
     return render(request, 'sales/order-form.html', context)
@@ -139,6 +139,69 @@ STATICFILES_DIRS = os.path.join(BASE_DIR, 'static'),
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared cache for every worker process: the dashboard blocks, the catalog snapshot and
+# image classification results are invalidated by bumping a version key, which only works
+# when all workers see the same cache. Create the table once with `manage.py createcachetable`
+# (or point this at Redis: django.core.cache.backends.redis.RedisCache).
+# With LocMemCache those version-invalidated caches are bypassed.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Dashboard KPI cache (seconds). Entries are also invalidated on every order/stock write.
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Product catalog snapshot used by the order form. Keys are versioned and bumped on every
+# product/stock write, so the timeout only bounds how long unused versions stay in the cache.
+CATALOG_SNAPSHOT_TIMEOUT = 86400
+
+# Stock reserved by a pending order is released after this many minutes
+# unless the order is confirmed first (manage.py expire_reservations, run from cron)
+STOCK_RESERVATION_TTL_MINUTES = 1440
+
+# Order list search: postgres_trigram, sqlite_fts5 or basic (None = pick by database engine)
+ORDER_SEARCH_BACKEND = None
+
+# Stored demand forecasts older than this are flagged as stale on the dashboard
+AI_FORECAST_STALE_HOURS = 24
+
+# Products without their own forecast history fall back to their category's day-of-week
+# profile. Models trained on the Kaggle CSV know Kaggle categories only, so map our
+# category_id to one, e.g. {'C01': 'Category_019'}; unmapped categories use the global profile.
+AI_FORECAST_CATEGORY_MAP = {}
+
+# Demand model backend: random_forest, hist_gradient_boosting, exp_smoothing or quantized_forest
+AI_FORECAST_BACKEND = 'random_forest'
+
+# CPU cores a background training job may use, so it does not starve the web workers
+AI_TRAINING_CORES = 2
+
+# A running training job whose worker has not sent a heartbeat for this long is marked
+# failed (the worker crashed or was killed), so new jobs can be started again
+AI_TRAINING_LEASE_SECONDS = 300
+
+# Product image classification: concurrent uploads are batched into one forward pass
+# of up to AI_IMAGE_BATCH_SIZE images, waiting at most AI_IMAGE_BATCH_DELAY_MS for more (1 = no batching)
+AI_IMAGE_BATCH_SIZE = 8
+AI_IMAGE_BATCH_DELAY_MS = 5
+# An upload waiting longer than this for its batch gets an error instead of hanging the request
+AI_IMAGE_BATCH_TIMEOUT_S = 30
+# Use media/models/mobilenet_v2_int8.pt (or _fp32.pt) from manage.py export_image_model when it exists
+AI_IMAGE_USE_COMPILED = True
+# Classification results cached by image content hash: per-process LRU size, shared cache timeout (s)
+AI_IMAGE_CACHE_SIZE = 256
+AI_IMAGE_CACHE_TIMEOUT = 86400
+# run_training_worker re-embeds changed product images into the similarity index between jobs
+AI_EMBEDDINGS_AUTO_UPDATE = True
+
+# AI models are loaded on first use. Set to True to load them on a background thread
+# when a web worker starts (wsgi.py) so the first upload/forecast request does not wait.
+AI_WARMUP_ON_START = False
+
 #
 LOGIN_REDIRECT_URL = '/inventory/'
 LOGOUT_REDIRECT_URL = '/'
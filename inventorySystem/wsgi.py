@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inventorySystem.settings')
 
 application = get_wsgi_application()
+
+# Optionally load the AI models on a background thread as soon as the worker starts
+from apps.ai_models.loader import warm_up_in_background  # noqa: E402
+warm_up_in_background()